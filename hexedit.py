@@ -21,9 +21,23 @@ __email__ = "Michael@MichaelSasser.de"
 # Used for Parser
 __description__ = "%(prog)s provides you the ability to view, convert, edit and manipulate Binary and Intel Hex files."
 
+import sys
+
 from pyhexedit._version import __version__
 from pyhexedit.colors import colorize
+from pyhexedit.compressed import COMPRESSIONS
+from pyhexedit.exporter import EXPORT_FORMATS
 from pyhexedit.hexedit import PyHexedit
+from pyhexedit.pattern import BytePattern
+from pyhexedit.strings import STRING_ENCODINGS
+from pyhexedit.valuescan import SCAN_TYPES
+
+
+def number(text: str) -> [int, float]:
+    try:
+        return int(text, 0)
+    except ValueError:
+        return float(text)
 
 
 def main(*args, **kwargs):
@@ -31,22 +45,69 @@ def main(*args, **kwargs):
 
     # Argparser
     parser: argparse.ArgumentParser = argparse.ArgumentParser(prog='pyhexedit', description=__description__)
-    parser.add_argument("input", help="The input file.", type=str)
+    parser.add_argument("input", help="The input file, or the parts of it in their order.", type=str, nargs="+")
     parser.add_argument("-o", "--output", help="The output file.", type=str, default=None)
     parser.add_argument("-b", "--begin", help="start", default=0, type=int)
     parser.add_argument("-e", "--end", help="end", default=(-1), type=int)
+    parser.add_argument("--base-offset", help="Open only a window of the file, which starts at this address. "
+                        "All addresses are relative to the window.", default=0, type=int)
+    parser.add_argument("--length", help="The length of the window. Default: up to the end of the file",
+                        default=None, type=int)
     parser.add_argument("-r", "--raw", help="raw-print", action="store_true")
     parser.add_argument("-l", "--lines", help="lines to pprint before next headline", type=int, default=16)
     parser.add_argument("-s", "--search", help="search", type=str, default=None)
     parser.add_argument("-a", "--all", help="all", action="store_true")
+    parser.add_argument("-p", "--pattern", help="The search value is a byte pattern with wildcards, nibble "
+                                                "masks and gaps, e.g. \"E8 ?? ?? ?? ?? 48 8B\", \"4? [2-8] C3\".",
+                        action="store_true")
+    parser.add_argument("--scan", help="Scan for numbers of this type at every address.", choices=SCAN_TYPES,
+                        default=None)
+    parser.add_argument("--value", help="The value to scan for.", type=number, default=None)
+    parser.add_argument("--min", help="The minimum value to scan for.", type=number, default=None)
+    parser.add_argument("--max", help="The maximum value to scan for.", type=number, default=None)
+    parser.add_argument("--tolerance", help="The tolerance of the value to scan for.", type=number, default=None)
+    parser.add_argument("--byteorder", help="The byteorder of the numbers. Default: \"little\"",
+                        choices=("little", "big"), default="little")
+    parser.add_argument("--alignment", help="Scan only addresses, which are a multiple of this. Default: 1",
+                        type=int, default=1)
+    parser.add_argument("--strings", help="Print the strings in the given comma separated encodings, e.g. "
+                        f"\"ascii,utf16le\". Encodings: {', '.join(STRING_ENCODINGS)}", metavar="ENCODINGS",
+                        type=str, default=None)
+    parser.add_argument("--min-length", help="The minimum length of the strings. Default: 4", type=int, default=4)
+    parser.add_argument("-i", "--interactive", help="Open the interactive viewer.", action="store_true")
+    parser.add_argument("-f", "--follow", help="Follow the appended data, like \"tail -f\". With -r, the raw bytes "
+                        "are written to stdout.", action="store_true")
+    parser.add_argument("-I", "--build-index", help="Build the search index of the input file before the search.",
+                        action="store_true")
     parser.add_argument("-E", "--edit", help="Safe edit.", action="store_true")
     parser.add_argument("-B", "--bytes", help="bytes per line", type=int, default=16)
+    parser.add_argument("-x", "--export", help="Export the range [begin:end] in the given format.",
+                        choices=EXPORT_FORMATS, default=None)
+    parser.add_argument("--export-file", help="The export file. Default: stdout", type=str, default=None)
+    parser.add_argument("--export-name", help="The variable name for c/rust/python exports.", type=str, default=None)
+    parser.add_argument("--compression", help="The compression of the input file. Default: \"auto\" (detected)",
+                        choices=["auto", "none", *COMPRESSIONS], default="auto")
     parser.add_argument("--bigfile-mode", help="Enables bigfile mode", action="store_true")
     parser.add_argument("--no_auto_bigfile-mode", help="Disables auto bigfile mode", action="store_false")
     parser.add_argument("--encoding", help="String encoding. Default: \"utf8\"", type=str, default="utf8")
     parser.add_argument("--verbose", help="Verbose display output.", action="store_true")
     parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
     args = parser.parse_args()
+    if args.pattern and args.search:
+        try:
+            args.search = BytePattern(args.search)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.strings is not None:
+        args.strings = [encoding.strip() for encoding in args.strings.split(",") if encoding.strip()]
+        unknown: list = [encoding for encoding in args.strings if encoding not in STRING_ENCODINGS]
+        if unknown or not args.strings:
+            parser.error(f"argument --strings: invalid encoding(s): \"{', '.join(unknown)}\" "
+                         f"(choose from {', '.join(STRING_ENCODINGS)})")
+
+    if args.follow and (args.edit or args.output):
+        parser.error("argument -f/--follow: not allowed with argument -E/--edit or -o/--output (an editable file is "
+                     "a copy of the input file and does not grow)")
 
     # Creating an PyHexedit instance
     hexedit = PyHexedit(args.input,
@@ -55,13 +116,58 @@ def main(*args, **kwargs):
                         encoding=args.encoding,
                         auto_bigfile_mode=args.no_auto_bigfile_mode,
                         bigfile_mode=args.bigfile_mode,
-                        editable=args.edit)
+                        editable=args.edit,
+                        compression=None if args.compression == "none" else args.compression,
+                        base_offset=args.base_offset,
+                        length=args.length)
 
     # print(bytes(hexedit))
     # hexedit[20] = "Hello World"
     # print(bytes(hexedit))
     # print("Search:", hexedit.find_all("Test", 0))
 
+    if args.export:
+        hexedit.export(args.export, args.export_file, args.begin, args.end, args.export_name)
+        return
+
+    if args.build_index:
+        hexedit.build_search_index()
+
+    if args.interactive:
+        hexedit.interactive()
+        return
+
+    if args.follow:
+        try:
+            if args.search:
+                for found in hexedit.follow_find_all(args.search, args.begin, not args.raw):
+                    if args.raw:
+                        print(found, flush=True)
+            elif args.raw:  # The appended bytes as they are, like "tail -c +begin -f"
+                for data in hexedit.follow_bytes(args.begin):
+                    sys.stdout.buffer.write(data)
+                    sys.stdout.buffer.flush()
+            else:
+                hexedit.follow(args.begin, args.lines)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.scan:
+        for found in hexedit.scan_values(args.scan, args.value, args.min, args.max, args.tolerance, args.byteorder,
+                                         args.alignment, args.begin, args.end, not args.raw):
+            if args.raw:
+                print(found, flush=True)
+        return
+
+    if args.strings is not None:
+        for found in hexedit.strings(args.min_length, args.strings, args.begin, args.end):
+            if args.raw:
+                print(found.address, found.text, flush=True)
+            else:
+                print(f"{found.address:08X}  {found.encoding:<7}  {found.text}", flush=True)
+        return
+
     if args.search:
         if args.all:
             found = hexedit.find_all(args.search, args.begin, args.end, not args.raw)
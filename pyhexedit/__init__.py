@@ -28,10 +28,30 @@ __license__: str = "GNU General Public License Version 3 (GPLv3)"
 
 from .common import *
 from .colors import *
+from .compressed import *
+from .exporter import *
 from .filehandler import *
+from .follow import *
 from .hexedit import *
+from .multifile import *
+from .pattern import *
+from .records import *
+from .searchindex import *
+from .strings import *
 from .systeminfo import *
+from .valuescan import *
+from .viewer import *
 
 __all__ = (hexedit.__all__,
+           compressed.__all__,
+           exporter.__all__,
            filehandler.__all__,
-           systeminfo.__all__)
+           follow.__all__,
+           multifile.__all__,
+           pattern.__all__,
+           records.__all__,
+           searchindex.__all__,
+           strings.__all__,
+           systeminfo.__all__,
+           valuescan.__all__,
+           viewer.__all__)
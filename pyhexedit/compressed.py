@@ -0,0 +1,512 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import json
+import logging
+import lzma
+import os
+import shutil
+import struct
+import zlib
+from bisect import bisect_right
+from collections import namedtuple
+from pathlib import Path
+
+__all__ = ['COMPRESSIONS', 'CompressedFile', 'compress_file', 'detect_compression']
+
+# Magic bytes of the supported compressions
+COMPRESSIONS: dict = {'gzip': b'\x1f\x8b',
+                      'xz': b'\xfd7zXZ\x00',
+                      'zstd': b'\x28\xb5\x2f\xfd'}
+
+INDEX_VERSION: int = 1
+IN_CHUNK: int = 1 << 20  # Compressed bytes read at once
+OUT_CHUNK: int = 1 << 20  # Maximum of decompressed bytes per piece
+SNAPSHOT_SPACING: int = 1 << 23  # Decompressed bytes between two in-memory gzip snapshots
+MAX_SNAPSHOTS: int = 1024  # About 40 KB each. If there are more, every other one is dropped and the spacing doubled.
+FORWARD_LIMIT: int = 1 << 24  # Reads up to this distance after the last one continue the running decompression
+
+# An independently decompressible unit (gzip member, xz block, zstd frame). "header" is the offset of the xz stream
+# header of a block, which is needed to decompress it.
+Unit = namedtuple('Unit', ['coff', 'clen', 'uoff', 'ulen', 'header'])
+
+# The state of a gzip decompressor inside of a unit. zlib states can only be copied in memory, so they are not saved
+# in the index file and are collected again while decompressing.
+Snapshot = namedtuple('Snapshot', ['uoff', 'coff', 'unit', 'state'])
+
+
+def detect_compression(file: [Path, str]) -> [str, None]:
+    """Detects the compression of a file by its magic bytes.
+
+    :param file: The file.
+    :type file: [Path, str]
+    :return: The compression (gzip/xz/zstd) or None
+    :rtype: [str, None]
+    """
+    with open(file, "rb") as fileobj:
+        magic: bytes = fileobj.read(6)
+    for compression, signature in COMPRESSIONS.items():
+        if magic.startswith(signature):
+            return compression
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard  # Optional dependency, only needed for zstd
+    except ImportError:
+        raise ImportError("The \"zstandard\" package is needed to open zstd compressed files.") from None
+    return zstandard
+
+
+def compress_file(src, dst: [Path, str], compression: str) -> None:
+    """Compresses a file.
+
+    :param src: The uncompressed source file or a binary file object.
+    :type src: [Path, str, BinaryIO]
+    :param dst: The compressed destination file.
+    :type dst: [Path, str]
+    :param compression: The compression: gzip/xz/zstd
+    :type compression: str
+    :return: None
+    :rtype: None
+    """
+    if isinstance(src, (Path, str)):
+        with open(src, "rb") as fsrc:
+            compress_file(fsrc, dst, compression)
+        return
+
+    fsrc = src
+    if compression == 'gzip':
+        import gzip
+        with gzip.open(dst, "wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst, IN_CHUNK)
+    elif compression == 'xz':
+        with lzma.open(dst, "wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst, IN_CHUNK)
+    elif compression == 'zstd':
+        with open(dst, "wb") as fdst:
+            _zstandard().ZstdCompressor().copy_stream(fsrc, fdst)
+    else:
+        raise ValueError(f"Unknown compression \"{compression}\".")
+
+
+def _varint(data: bytes, pos: int) -> tuple:
+    value: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class _UnitReader(object):
+    # Reads only the compressed bytes of a unit. The zstd stream reader continues with the next frame otherwise, even
+    # with read_across_frames=False.
+    def __init__(self, fileobj, unit: Unit) -> None:
+        self.fileobj = fileobj
+        self.remaining: int = unit.clen
+        fileobj.seek(unit.coff)
+
+    def read(self, size: int = -1) -> bytes:
+        data: bytes = self.fileobj.read(self.remaining if size < 0 else min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+
+class CompressedFile(object):
+    def __init__(self, file: [Path, str], compression: str = None, index_file: [Path, str] = None) -> None:
+        """The CompressedFile gives random access to a gzip, xz or zstd compressed file, without decompressing it
+        to the drive.
+
+        On the first opening, a seek index of all independently decompressible units (gzip members, xz blocks and
+        zstd frames) is build and saved as index file next to the compressed file. It is reused on later openings,
+        as long as the size and modification time of the compressed file are unchanged. A read decompresses only
+        from the nearest unit or, for gzip, from the nearest decompressor state, collected in memory while
+        decompressing. Sequential reads continue the running decompression.
+
+        Files made of a single unit (like "gzip file", "pigz file" (even with --independent), "xz -T1 file" or
+        "zstd file" (even with -T or -B)) can only be decompressed from their begin, or for gzip from the nearest
+        collected decompressor state. Use "bgzip", "xz -T0" or "pzstd" to create files of many units.
+
+        :param file: The compressed file.
+        :type file: [Path, str]
+        :param compression: The compression: gzip/xz/zstd. default = None (detect by the magic bytes)
+        :type compression: str
+        :param index_file: The index file. default = None (the file name + ".phx")
+        :type index_file: [Path, str]
+        :return: None
+        :rtype: None
+        """
+        self.file: Path = Path(file)
+        self.compression: str = compression or detect_compression(self.file)
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression \"{self.compression}\" of \"{self.file}\".")
+        self.index_file: Path = Path(index_file) if index_file else self.file.with_name(self.file.name + ".phx")
+
+        self.fileobj = None
+        self.__snapshots: list = []
+        self.__snapshot_offsets: list = []
+        self.__snapshot_spacing: int = SNAPSHOT_SPACING
+        self.__cursor = None
+        self.__piece: tuple = (0, b'')
+
+        self.units: list = self.__load_index()
+        if self.units is None:
+            logging.info(f"Building the seek index of \"{self.file}\"...")
+            self.units = self.__build_index()
+            self.__save_index()
+        self.__unit_offsets: list = [unit.uoff for unit in self.units]
+        self.length: int = self.units[-1].uoff + self.units[-1].ulen if self.units else 0
+
+    def __key(self) -> dict:
+        stat: os.stat_result = os.stat(self.file)
+        return {'version': INDEX_VERSION, 'compression': self.compression,
+                'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def __load_index(self) -> [list, None]:
+        try:
+            with self.index_file.open("r") as index:
+                content: dict = json.load(index)
+        except (IOError, ValueError):
+            return None
+        if content.get('key') != self.__key():
+            logging.info(f"The seek index \"{self.index_file}\" is outdated.")
+            return None
+        return [Unit(*unit) for unit in content['units']]
+
+    def __save_index(self) -> None:
+        try:
+            with self.index_file.open("w") as index:
+                json.dump({'key': self.__key(), 'units': self.units}, index)
+        except IOError as e:
+            logging.warning(f"The seek index could not be saved: {e}")
+
+    def __open(self):
+        if self.fileobj is None:
+            self.fileobj = self.file.open("rb")
+        return self.fileobj
+
+    def close(self) -> None:
+        self.__cursor = None
+        self.__piece = (0, b'')
+        if self.fileobj is not None:
+            self.fileobj.close()
+            self.fileobj = None
+
+    # Building the index
+
+    def __build_index(self) -> list:
+        fileobj = self.__open()
+        size: int = os.fstat(fileobj.fileno()).st_size
+        if self.compression == 'gzip':
+            return self.__scan_gzip(fileobj, size)
+        if self.compression == 'xz':
+            return self.__scan_xz(fileobj, size)
+        return self.__scan_zstd(fileobj, size)
+
+    def __scan_gzip(self, fileobj, size: int) -> list:
+        # The end of a member is only known after decompressing it. The snapshots are collected on the way.
+        units: list = []
+        coff: int = 0
+        uoff: int = 0
+        while coff < size:
+            fileobj.seek(coff)
+            if fileobj.read(2) != COMPRESSIONS['gzip']:
+                logging.warning(f"Ignoring {size - coff} bytes of trailing garbage after the last gzip member.")
+                break
+            ulen: int = 0
+            clen: int = 0
+            decompressor = None
+            for piece, consumed, decompressor in self.__inflate_gzip(fileobj, coff, size, None):
+                ulen += len(piece)
+                self.__snapshot(uoff + ulen, len(units), consumed, decompressor)
+                clen = consumed - coff
+            if decompressor is None or not decompressor.eof:
+                raise IOError("The gzip file is damaged (truncated member).")
+            units.append(Unit(coff, clen, uoff, ulen, 0))
+            coff += clen
+            uoff += ulen
+        return units
+
+    @staticmethod
+    def __scan_xz(fileobj, size: int) -> list:
+        # xz files carry an index of their blocks at the end of every stream
+        streams: list = []
+        end: int = size
+        while end > 0:
+            fileobj.seek(end - 12)
+            footer: bytes = fileobj.read(12)
+            if footer[8:] == bytes(4):  # Stream padding (a multiple of 4 null bytes)
+                end -= 4
+                continue
+            if footer[10:] != b'YZ':
+                raise IOError("The xz file is damaged (no stream footer).")
+            index_size: int = (struct.unpack('<I', footer[4:8])[0] + 1) * 4
+            fileobj.seek(end - 12 - index_size)
+            index: bytes = fileobj.read(index_size)
+            count, pos = _varint(index, 1)
+            blocks: list = []
+            for _ in range(count):
+                unpadded, pos = _varint(index, pos)
+                uncompressed, pos = _varint(index, pos)
+                blocks.append((unpadded + (-unpadded % 4), uncompressed))
+            header: int = end - 12 - index_size - sum(padded for padded, _ in blocks) - 12
+            streams.append((header, blocks))
+            end = header
+
+        units: list = []
+        uoff: int = 0
+        for header, blocks in reversed(streams):
+            coff: int = header + 12
+            for padded, uncompressed in blocks:
+                units.append(Unit(coff, padded, uoff, uncompressed, header))
+                coff += padded
+                uoff += uncompressed
+        return units
+
+    def __scan_zstd(self, fileobj, size: int) -> list:
+        # The frames are found by their headers and block headers. Their sizes are only known after decompressing.
+        units: list = []
+        coff: int = 0
+        uoff: int = 0
+        while coff < size:
+            fileobj.seek(coff)
+            header: bytes = fileobj.read(18)
+            magic: int = struct.unpack('<I', header[:4])[0] if len(header) >= 4 else 0
+            if 0x184D2A50 <= magic <= 0x184D2A5F:  # Skippable frame
+                if len(header) < 8:
+                    raise IOError("damaged zstd frame (truncated skippable frame)")
+                coff += 8 + struct.unpack('<I', header[4:8])[0]
+                continue
+            if magic != 0xFD2FB528:
+                logging.warning(f"Ignoring {size - coff} bytes of trailing garbage after the last zstd frame.")
+                break
+            if len(header) < 5:
+                raise IOError("damaged zstd frame (truncated frame header)")
+            descriptor: int = header[4]
+            pos: int = coff + 5 + (0 if descriptor & 0x20 else 1) + (0, 1, 2, 4)[descriptor & 0x03] \
+                + (1 if descriptor & 0x20 else 0, 2, 4, 8)[descriptor >> 6]
+            while True:
+                if pos + 3 > size:
+                    raise IOError("damaged zstd frame (truncated block)")
+                fileobj.seek(pos)
+                block: int = int.from_bytes(fileobj.read(3), 'little')
+                pos += 3 + (1 if (block >> 1) & 0x03 == 1 else block >> 3)
+                if block & 0x01:  # Last block
+                    break
+            pos += 4 if descriptor & 0x04 else 0  # Checksum
+            if pos > size:
+                raise IOError("damaged zstd frame (truncated frame)")
+            unit: Unit = Unit(coff, pos - coff, uoff, 0, 0)
+            ulen: int = sum(len(piece) for piece in self.__inflate_zstd(fileobj, unit))
+            units.append(unit._replace(ulen=ulen))
+            coff = pos
+            uoff += ulen
+        return units
+
+    # Decompression
+
+    @staticmethod
+    def __inflate_gzip(fileobj, coff: int, cend: int, state):
+        decompressor = state.copy() if state is not None else zlib.decompressobj(31)
+        fileobj.seek(coff)
+        pos: int = coff
+        tail: bytes = b''
+        while not decompressor.eof:
+            if not tail and pos < cend:
+                tail = fileobj.read(min(IN_CHUNK, cend - pos))
+                pos += len(tail)
+            fed: int = pos - len(tail)
+            piece: bytes = decompressor.decompress(tail, OUT_CHUNK)
+            if decompressor.eof:  # The end of the member. The rest of the input is unused.
+                yield piece, fed + len(tail) - len(decompressor.unused_data), decompressor
+                break
+            tail = decompressor.unconsumed_tail
+            if not piece and not tail and pos >= cend:
+                break
+            yield piece, pos - len(tail), decompressor
+
+    @staticmethod
+    def __inflate_xz(fileobj, unit: Unit):
+        decompressor: lzma.LZMADecompressor = lzma.LZMADecompressor(lzma.FORMAT_XZ)
+        fileobj.seek(unit.header)
+        decompressor.decompress(fileobj.read(12))  # The stream header
+        fileobj.seek(unit.coff)
+        pos: int = unit.coff
+        cend: int = unit.coff + unit.clen
+        while True:
+            data: bytes = b''
+            if decompressor.needs_input:
+                if pos >= cend:  # The decompressor waits for the next block or the index now
+                    break
+                data = fileobj.read(min(IN_CHUNK, cend - pos))
+                pos += len(data)
+            yield decompressor.decompress(data, OUT_CHUNK)
+
+    @staticmethod
+    def __inflate_zstd(fileobj, unit: Unit):
+        reader = _zstandard().ZstdDecompressor().stream_reader(_UnitReader(fileobj, unit), read_size=IN_CHUNK,
+                                                                read_across_frames=False, closefd=False)
+        while True:
+            piece: bytes = reader.read(OUT_CHUNK)
+            if not piece:
+                break
+            yield piece
+
+    def __snapshot(self, uoff: int, unit: int, coff: int, decompressor) -> None:
+        index: int = bisect_right(self.__snapshot_offsets, uoff)
+        last: int = self.__snapshots[index - 1].uoff if index else 0
+        spacing: int = self.__snapshot_spacing
+        following: int = self.__snapshots[index].uoff if index < len(self.__snapshots) else uoff + spacing
+        if uoff - last >= spacing and following - uoff >= spacing and not decompressor.eof:
+            self.__snapshots.insert(index, Snapshot(uoff, coff, unit, decompressor.copy()))
+            self.__snapshot_offsets.insert(index, uoff)
+            if len(self.__snapshots) > MAX_SNAPSHOTS:  # Keeps the memory bounded for streams of any size
+                del self.__snapshots[1::2]
+                del self.__snapshot_offsets[1::2]
+                self.__snapshot_spacing *= 2
+
+    def __stream(self, offset: int):
+        """Generates the decompressed pieces as (offset, piece) tuples, beginning at the nearest point before the
+        offset."""
+        fileobj = self.__open()
+        first: int = max(0, bisect_right(self.__unit_offsets, offset) - 1)
+        for number in range(first, len(self.units)):
+            unit: Unit = self.units[number]
+            uoff: int = unit.uoff
+            if self.compression == 'gzip':
+                coff: int = unit.coff
+                state = None
+                index: int = bisect_right(self.__snapshot_offsets, offset) - 1
+                if number == first and index >= 0 and self.__snapshots[index].unit == number:
+                    uoff, coff, _, state = self.__snapshots[index]
+                for piece, consumed, decompressor in self.__inflate_gzip(fileobj, coff, unit.coff + unit.clen,
+                                                                         state):
+                    yield uoff, piece
+                    uoff += len(piece)
+                    self.__snapshot(uoff, number, consumed, decompressor)
+            else:
+                pieces = self.__inflate_xz(fileobj, unit) if self.compression == 'xz' \
+                    else self.__inflate_zstd(fileobj, unit)
+                for piece in pieces:
+                    yield uoff, piece
+                    uoff += len(piece)
+
+    def pieces(self, offset: int):
+        """Generates the decompressed pieces as (offset, piece) tuples from the piece containing "offset" on. A read
+        after or shortly behind the last one continues the running decompression.
+
+        :param offset: The offset.
+        :type offset: int
+        :return: The pieces
+        :rtype: Iterator[tuple]
+        """
+        piece_offset, piece = self.__piece
+        piece_end: int = piece_offset + len(piece)
+        if piece_offset <= offset < piece_end:
+            yield piece_offset, piece
+            if self.__cursor is None:  # The end of the file is reached
+                return
+        elif not (self.__cursor is not None and piece_end <= offset < piece_end + FORWARD_LIMIT):
+            self.__cursor = self.__stream(offset)
+            self.__piece = (0, b'')
+
+        for piece_offset, piece in self.__cursor:
+            self.__piece = (piece_offset, piece)
+            if piece_offset + len(piece) > offset:
+                yield piece_offset, piece
+        self.__cursor = None
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Reads "length" bytes from "offset" on.
+
+        :param offset: The offset.
+        :type offset: int
+        :param length: The number of bytes.
+        :type length: int
+        :return: The decompressed bytes
+        :rtype: bytes
+        """
+        stop: int = min(offset + length, self.length)
+        if offset >= stop:
+            return b''
+        data: bytearray = bytearray()
+        for piece_offset, piece in self.pieces(offset):
+            data += piece[max(0, offset - piece_offset):stop - piece_offset]
+            if piece_offset + len(piece) >= stop:
+                break
+        return bytes(data)
+
+    def find(self, value: bytes, start: int = 0, stop: int = -1) -> int:
+        """Searches for "value" while decompressing the range [start:stop].
+
+        :param value: The value to search for.
+        :type value: bytes
+        :param start: The start of the search. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop of the search. default = -1 (the end of the file)
+        :type stop: int
+        :return: The offset of the value or -1
+        :rtype: int
+        """
+        stop = self.length if stop == -1 else min(stop, self.length)
+        carry: bytes = b''  # The end of the last piece, for matches across the pieces
+        carry_offset: int = start
+        for piece_offset, piece in self.pieces(start):
+            if piece_offset < start:
+                piece = piece[start - piece_offset:]
+                piece_offset = start
+            if piece_offset + len(piece) > stop:
+                piece = piece[:max(0, stop - piece_offset)]
+            window: bytes = carry + piece
+            found: int = window.find(value)
+            if found != -1:
+                return carry_offset + found
+            if piece_offset + len(piece) >= stop:
+                break
+            carry = window[max(0, len(window) - len(value) + 1):] if len(value) > 1 else b''
+            carry_offset = piece_offset + len(piece) - len(carry)
+        return -1
+
+    def decompress_to(self, dst: [Path, str]) -> None:
+        """Decompresses the whole file.
+
+        :param dst: The destination file.
+        :type dst: [Path, str]
+        :return: None
+        :rtype: None
+        """
+        with open(dst, "wb") as fdst:
+            for _, piece in self.pieces(0):
+                fdst.write(piece)
+
+    def readinto(self, buffer: bytearray) -> None:
+        position: int = 0
+        for _, piece in self.pieces(0):
+            buffer[position:position + len(piece)] = piece
+            position += len(piece)
+
+    def __len__(self) -> int:
+        return self.length
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import binascii
+import logging
+import re
+import sys
+from array import array
+from pathlib import Path
+
+__all__ = ['EXPORT_FORMATS', 'export']
+
+# Bytes read and formatted per step. Only one chunk (and its text) is held in memory at a time. Small chunks keep
+# the strided writes of the formatter inside of the CPU cache, which is much faster than formatting bigger ones.
+CHUNK_SIZE: int = 1 << 14
+
+# Printable ASCII stays as it is, everything else becomes a '.' (like xxd does it)
+_PRINTABLE: bytes = bytes(n if 0x20 <= n < 0x7f else 0x2e for n in range(256))
+
+
+def _layout(template: bytes, nlines: int, columns: list) -> bytearray:
+    """Repeats the line template "nlines" times and scatters the columns into it.
+
+    Every column is a tuple of the position inside of the line and a bytes object, which holds exactly one
+    character per line. The scattering is done with extended slice assignments, so the per byte work is done in C.
+
+    :param template: The template of one line.
+    :type template: bytes
+    :param nlines: The number of lines.
+    :type nlines: int
+    :param columns: The (position, source) tuples.
+    :type columns: list
+    :return: The rendered lines
+    :rtype: bytearray
+    """
+    out: bytearray = bytearray(template * nlines)
+    stride: int = len(template)
+    for position, source in columns:
+        out[position::stride] = source
+    return out
+
+
+class _HexItemFormat(object):
+    """Formats every byte as an item with two hex digits, like "0x7f" or "\\x7f" (C, Rust and Python)."""
+
+    def __init__(self, prefix: bytes, item: bytes, separator: bytes, suffix: bytes, bytes_per_line: int) -> None:
+        self.prefix: bytes = prefix
+        self.item: bytes = item
+        self.separator: bytes = separator
+        self.suffix: bytes = suffix
+        self.bytes_per_line: int = bytes_per_line
+        self.digit: int = item.index(b'00')
+
+    def render(self, data: bytes, offset: int) -> bytes:
+        full: int = len(data) - len(data) % self.bytes_per_line
+        out: bytes = bytes(self._lines(data[:full], self.bytes_per_line))
+        if full != len(data):
+            out += self._lines(data[full:], len(data) - full)
+        return out
+
+    def _lines(self, data: bytes, width: int) -> bytearray:
+        template: bytes = self.prefix + self.separator.join([self.item] * width) + self.suffix
+        hexed: bytes = binascii.hexlify(data)
+        step: int = len(self.item) + len(self.separator)
+        columns: list = []
+        for k in range(width):
+            position: int = len(self.prefix) + k * step + self.digit
+            columns.append((position, hexed[2 * k::2 * width]))
+            columns.append((position + 1, hexed[2 * k + 1::2 * width]))
+        return _layout(template, len(data) // width, columns)
+
+
+class _CFormat(_HexItemFormat):
+    def __init__(self, bytes_per_line: int) -> None:
+        super().__init__(b'  ', b'0x00', b', ', b',\n', bytes_per_line)
+
+    @staticmethod
+    def header(name: str, length: int) -> bytes:
+        return f"unsigned char {name}[] = {{\n".encode()
+
+    @staticmethod
+    def footer(name: str, length: int) -> bytes:
+        return f"}};\nunsigned int {name}_len = {length};\n".encode()
+
+
+class _RustFormat(_HexItemFormat):
+    def __init__(self, bytes_per_line: int) -> None:
+        super().__init__(b'    ', b'0x00', b', ', b',\n', bytes_per_line)
+
+    @staticmethod
+    def header(name: str, length: int) -> bytes:
+        return f"pub static {name.upper()}: [u8; {length}] = [\n".encode()
+
+    @staticmethod
+    def footer(name: str, length: int) -> bytes:
+        return b"];\n"
+
+
+class _PythonFormat(_HexItemFormat):
+    def __init__(self, bytes_per_line: int) -> None:
+        super().__init__(b"    b'", b'\\x00', b'', b"'\n", bytes_per_line)
+
+    @staticmethod
+    def header(name: str, length: int) -> bytes:
+        return f"{name} = bytes(\n".encode()  # bytes() keeps an empty range a bytes object
+
+    @staticmethod
+    def footer(name: str, length: int) -> bytes:
+        return b")\n"
+
+
+class _Base64Format(object):
+    def __init__(self, bytes_per_line: int) -> None:
+        if bytes_per_line % 3:
+            raise ValueError("The bytes per line must be a multiple of 3 for base64.")
+        self.bytes_per_line: int = bytes_per_line
+
+    def render(self, data: bytes, offset: int) -> bytes:
+        full: int = len(data) - len(data) % self.bytes_per_line
+        width: int = self.bytes_per_line // 3 * 4
+        encoded: bytes = binascii.b2a_base64(data[:full], newline=False)
+        out: bytes = bytes(_layout(b' ' * width + b'\n', full // self.bytes_per_line,
+                                   [(k, encoded[k::width]) for k in range(width)]))
+        if full != len(data):
+            out += binascii.b2a_base64(data[full:])
+        return out
+
+    @staticmethod
+    def header(name: str, length: int) -> bytes:
+        return b""
+
+    @staticmethod
+    def footer(name: str, length: int) -> bytes:
+        return b""
+
+
+class _XxdFormat(object):
+    """Formats the range like "xxd" does, so "xxd -r" can convert it back."""
+
+    def __init__(self, bytes_per_line: int, end: int) -> None:
+        self.bytes_per_line: int = bytes_per_line
+        self.digits: int = max(8, len(f"{end:x}"))
+
+    def render(self, data: bytes, offset: int) -> bytes:
+        full: int = len(data) - len(data) % self.bytes_per_line
+        out: bytes = bytes(self._lines(data[:full], offset, self.bytes_per_line))
+        if full != len(data):
+            out += self._lines(data[full:], offset + full, len(data) - full)
+        return out
+
+    def _lines(self, data: bytes, offset: int, width: int) -> bytearray:
+        nlines: int = len(data) // width
+        hex_area: bytes = b''
+        positions: list = []
+        for k in range(self.bytes_per_line):
+            positions.append(self.digits + 2 + len(hex_area))
+            hex_area += b'00' if k < width else b'  '
+            if k % 2 or k == self.bytes_per_line - 1:
+                hex_area += b' '
+        template: bytes = b'0' * self.digits + b': ' + hex_area + b' ' + b'.' * width + b'\n'
+
+        # Offsets are rendered as big endian 64 bit integers, of which only the last digits are used
+        offsets: array = array('Q', range(offset, offset + nlines * width, width))
+        if sys.byteorder == 'little':
+            offsets.byteswap()
+        hexed_offsets: bytes = binascii.hexlify(offsets.tobytes())
+        columns: list = [(d, hexed_offsets[16 - self.digits + d::16]) for d in range(self.digits)]
+
+        hexed: bytes = binascii.hexlify(data)
+        printable: bytes = data.translate(_PRINTABLE)
+        ascii_start: int = self.digits + 2 + len(hex_area) + 1
+        for k in range(width):
+            columns.append((positions[k], hexed[2 * k::2 * width]))
+            columns.append((positions[k] + 1, hexed[2 * k + 1::2 * width]))
+            columns.append((ascii_start + k, printable[k::width]))
+        return _layout(template, nlines, columns)
+
+    @staticmethod
+    def header(name: str, length: int) -> bytes:
+        return b""
+
+    @staticmethod
+    def footer(name: str, length: int) -> bytes:
+        return b""
+
+
+# Format name: (class, default bytes per line)
+EXPORT_FORMATS: dict = {'c': (_CFormat, 12),
+                        'rust': (_RustFormat, 12),
+                        'python': (_PythonFormat, 16),
+                        'base64': (_Base64Format, 57),
+                        'xxd': (_XxdFormat, 16)}
+
+
+def export(handler, fmt: str, file=None, begin: int = 0, end: int = -1, name: str = None,
+           bytes_per_line: int = None, chunk_size: int = CHUNK_SIZE) -> int:
+    """The "export()" function streams the range [begin:end] of a file as C array, Rust or Python byte literal,
+    base64 or xxd compatible text to a file.
+
+    The range is read and formatted in chunks of "chunk_size" bytes, so the whole range is never held in memory.
+    The formatting is done with strided slice assignments. Measured throughput of the input: about 25 to 55 MB/s
+    for xxd, 45 to 65 MB/s for c, rust and python and 65 to 160 MB/s for base64, depending on the machine. This
+    does not reach the targeted hundreds of MB/s.
+
+    :param handler: The FileHandler (or PyHexedit) to export from.
+    :type handler: FileHandler
+    :param fmt: The format: c/rust/python/base64/xxd
+    :type fmt: str
+    :param file: The output file. A path, a binary file object or None for stdout. default = None
+    :type file: [Path, str, BinaryIO]
+    :param begin: The start of the range. default = 0 (begin of the file)
+    :type begin: int
+    :param end: The end of the range. default = -1 (the end of the file)
+    :type end: int
+    :param name: The variable name used by c/rust/python. default = "data"
+    :type name: str
+    :param bytes_per_line: The number of bytes per line. default = depends on the format
+    :type bytes_per_line: int
+    :param chunk_size: The number of bytes read per step. default = 16 KiB
+    :type chunk_size: int
+    :return: The number of bytes exported
+    :rtype: int
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format \"{fmt}\". Choose one of: {', '.join(EXPORT_FORMATS)}")
+
+    end = len(handler) if end == -1 else min(end, len(handler))
+    begin = min(begin, end)
+    length: int = end - begin
+
+    cls, default_bytes_per_line = EXPORT_FORMATS[fmt]
+    bytes_per_line = bytes_per_line or default_bytes_per_line
+    formatter = cls(bytes_per_line, end) if cls is _XxdFormat else cls(bytes_per_line)
+
+    # Every chunk, except of the last one, has to contain only full lines
+    chunk_size = max(bytes_per_line, chunk_size - chunk_size % bytes_per_line)
+    name = re.sub(r'\W', '_', name or "data")
+    if name[0].isdigit():
+        name = '_' + name
+
+    logging.debug(f"Exporting {length} bytes from {begin:08X} as {fmt}.")
+    if file is None:
+        out = sys.stdout.buffer
+    elif isinstance(file, (Path, str)):
+        out = Path(file).open("wb")
+    else:
+        out = file
+
+    try:
+        out.write(formatter.header(name, length))
+        for position in range(begin, end, chunk_size):
+            chunk: bytes = bytes(handler[position:min(position + chunk_size, end)])
+            out.write(formatter.render(chunk, position))
+        out.write(formatter.footer(name, length))
+        out.flush()
+    finally:
+        if out is not file and out is not sys.stdout.buffer:
+            out.close()
+    return length
@@ -21,16 +21,25 @@ __email__ = "Michael@MichaelSasser.de"
 
 import gc
 import logging
+import io
+import lzma
 import mmap
 import os
+import zlib
+from bisect import bisect_right
 from pathlib import Path
-from shutil import copyfile
 
-from pyhexedit import systeminfo
+from pyhexedit import fileops, systeminfo
 from pyhexedit.common import random_string
+from pyhexedit.compressed import CompressedFile, compress_file, detect_compression
+from pyhexedit.pattern import BytePattern
+from pyhexedit.searchindex import BLOCK_SIZE, SearchIndex
 
 __all__ = ['FileHandler']
 
+# Bytes, which are processed at once by operations on bigger ranges (fill, copy, ...)
+CHUNK_SIZE: int = 1 << 20
+
 
 class NotEditableError(Exception):
     pass
@@ -47,7 +56,10 @@ class FileHandler(object):
                  auto_inram_mode: bool = True,
                  encoding: str = "utf8",
                  bytes_per_line: int = 16,
-                 infile_edit: bool = False) -> None:
+                 infile_edit: bool = False,
+                 compression: str = "auto",
+                 base_offset: int = 0,
+                 length: int = None) -> None:
         """The FileHandler openes, closes and operates exclusively and directly with the file. That means, that no
         other class or function is dealing with the file. This class is reduced to the basic file operation functions.
         It also handles the file as like as a variable.
@@ -75,6 +87,16 @@ class FileHandler(object):
           * Read/Write:
             Read and write operations are performed in the cached file.
 
+        Compressed files (gzip, xz, zstd) are opened like uncompressed files. In direct mode, a read only file is
+        decompressed on demand with the seek index of "CompressedFile". An editable file is decompressed to the
+        tempfile (or the outputfile) and compressed again, when it is saved. In RAM mode, the file is decompressed
+        into the cache. Infile edit is not possible for compressed files.
+
+        With base_offset and length, only a window of the file is opened (e.g. a partition of a disk image). All
+        addresses are relative to the window, memory maps cover only the window, RAM mode caches only the window
+        and the tempfile (or the outputfile) is a copy of the window, which is written back into the file by
+        "save()". A window can not grow. Windows of compressed files are read only.
+
         :param file: The file.
         :type file: str
         :param outputfile: The outputfile, if the changes should be saved to another file.
@@ -94,6 +116,12 @@ class FileHandler(object):
         :param infile_edit: infile edit for direct mode. If enabled the Read, write and seek operations are
           performed directly in the file.
         :type infile_edit: bool
+        :param compression: The compression of the file: auto/gzip/xz/zstd or None (uncompressed). default = 'auto'
+        :type compression: str
+        :param base_offset: The address of the window in the file. default = 0 (begin of the file)
+        :type base_offset: int
+        :param length: The length of the window. default = None (up to the end of the file)
+        :type length: int
         :return: None
         :rtype: None
         """
@@ -118,6 +146,33 @@ class FileHandler(object):
             logging.error("The input file doesn't exists. Please specify an existing input file.")
             raise IOError("The input file doesn't exists. Please specify an existing input file.")
 
+        # Compressed input file
+        self.compressed: CompressedFile = None
+        detected: bool = compression == "auto"
+        if detected:
+            compression = detect_compression(self.infile)
+        if compression:
+            try:
+                self.compressed = CompressedFile(self.infile, compression)
+            except (zlib.error, lzma.LZMAError, ImportError, IOError) as e:
+                if not detected:
+                    raise
+                # A hex editor has to open damaged files too
+                logging.warning(f"\"{self.infile}\" looks {compression} compressed, but can not be decompressed "
+                                f"({e}). It is opened as it is.")
+        if self.compressed:
+            if infile_edit:
+                logging.warning("A compressed file can not be edited in place. A tempfile is used instead.")
+                infile_edit = False
+
+        # Window
+        if base_offset < 0 or (length is not None and length < 0):
+            raise ValueError("The base offset and the length of the window must not be negative.")
+        self.base_offset: int = base_offset
+        self.window_length: int = length
+        if self.compressed and self.__windowed() and (editable or outputfile):
+            raise NotImplementedError("A window of a compressed file can only be opened read only.")
+
         self.__direct_edit: bool = infile_edit
         self.__editable: bool = editable
         self.unsaved_changes: bool = False
@@ -144,7 +199,10 @@ class FileHandler(object):
             self.auto_inram_mode = auto_inram_mode
             logging.debug(f"Auto bigfile mode is: {self.auto_inram_mode}")
 
-        self.infile_size: int = os.path.getsize(self.infile)
+        total_size: int = len(self.compressed) if self.compressed else os.path.getsize(self.infile)
+        if base_offset > total_size:
+            raise ValueError(f"The window starts after the end of the file ({total_size} bytes).")
+        self.infile_size: int = self.__window(total_size)
         try:
             unused_memory: systeminfo.Memory = systeminfo.unused_memory()
         except NotImplementedError as e:
@@ -168,10 +226,15 @@ class FileHandler(object):
 
         self.infile_obj = None
         self.infile_cached = None
+        self.memory_map = None
+        self.__extent_cache: tuple = None  # (size, offsets, extents) of the whole file, see "extents()"
+
+        # Used by find, if the index file exists and is up to date. Loaded by the first search.
+        self.search_index: SearchIndex = None
 
     def __op_open(self) -> None:
         try:
-            if not self.__editable:
+            if not self.__editable or self.__direct_edit:
                 self.infile_obj = self.infile.open("rb") if not self.__direct_edit else self.infile.open("r+b")
             else:
                 self.infile_obj = self.tempfile.open("r+b")  # NOT "w+b", use "r+b"
@@ -187,34 +250,77 @@ class FileHandler(object):
             self.close()
         if self.__direct_mode:
             try:
-                if not self.__editable:
+                if self.__reads_compressed():
+                    pass  # Read on demand by self.compressed, there is no file object
+                elif not self.__editable or self.__direct_edit:  # The input file itself is edited in place
                     self.infile_obj = self.infile.open("rb") if not self.__direct_edit else self.infile.open("r+b")
                 else:
-                    copyfile(self.infile.absolute(), self.tempfile.absolute())  # There might be an error?
+                    if self.compressed:
+                        self.compressed.decompress_to(self.tempfile.absolute())
+                    else:
+                        fileops.sparse_copyfile(self.infile.absolute(), self.tempfile.absolute(),  # There might be an error?
+                                                start=self.base_offset, length=self.window_length)
                     self.infile_obj = self.tempfile.open("r+b")  # NOT "w+b", use "r+b"
             except IOError:
                 self.close()
                 logging.exception("The input file is not readable. Do you have the right permissions?")
         else:
             try:
-                self.infile_cached = self.infile.read_bytes()  # ToDo: Editable...
+                # A bytearray can be changed in place, so views on it stay valid after an edit
+                if self.compressed and self.__windowed():
+                    self.infile_cached = bytearray(self.compressed.read(self.base_offset,
+                                                                        self.__window(len(self.compressed))))
+                elif self.compressed:
+                    self.infile_cached = bytearray(len(self.compressed))
+                    self.compressed.readinto(self.infile_cached)
+                else:
+                    with self.infile.open("rb") as infile:
+                        self.infile_cached = bytearray(self.__window(os.path.getsize(self.infile)))
+                        infile.seek(self.base_offset)
+                        infile.readinto(self.infile_cached)
             except IOError:
                 logging.exception("The input file is not readable. Do you have the right permissions?")
 
-    def make_editable(self) -> None:
+    def make_editable(self, infile_edit: bool = None) -> None:
         """The "make_editable()" method makes a file, that is read only editable.
 
+        In direct mode the file is copied to the tempfile first, which takes a while for big files (see
+        "edit_copy_size()"). With infile edit, the input file is edited in place instead and every change is
+        written to it immediately.
+
+        :param infile_edit: Edit the input file in place (direct mode only)? default = None (as given to the
+          constructor)
+        :type infile_edit: bool
         :return: None
         :rtype: None
         """
         if not self.__editable:
+            if self.compressed and self.__windowed():
+                raise NotImplementedError("A window of a compressed file can only be opened read only.")
+            if infile_edit is not None:
+                if infile_edit and self.compressed:
+                    raise NotImplementedError("A compressed file can not be edited in place.")
+                self.__direct_edit = infile_edit
             if self.__direct_mode:
                 self.close()
+                if self.tempfile is None and not self.__direct_edit:
+                    self.tempfile = self.infile.with_name(self.infile.name + f"_{random_string(4)}_.phe")
                 self.__editable = True  # For future use only in this order
                 self.open()
             else:
                 self.__editable = True
 
+    def edit_copy_size(self) -> int:
+        """Returns the number of bytes, which "make_editable()" copies to the tempfile. This is the size of the
+        file (or the window) in direct mode and 0, if the file is already editable, edited in place or cached in RAM.
+
+        :return: The number of bytes
+        :rtype: int
+        """
+        if self.__editable or not self.__direct_mode or self.__direct_edit:
+            return 0
+        return len(self) if self.infile_obj is not None or self.__reads_compressed() else self.infile_size
+
     def save(self) -> None:
         """The "save()" method saves the changes to the file.
 
@@ -224,8 +330,9 @@ class FileHandler(object):
         if not self.__editable:
             raise NotEditableError("The file is not editable and can not be saved.")
 
-        if self.__direct_edit:  # ToDo: implement direct mode correctly! (Not here. yfyi...)
+        if self.__direct_edit and self.__direct_mode:
             logging.info("Due to direct edit mode, all changes are made directly to the file. Nothing to do...")
+            self.unsaved_changes = False
             return
 
         if self.__tempfile_is_outputfile:
@@ -235,14 +342,127 @@ class FileHandler(object):
         if self.unsaved_changes:
             if self.__direct_mode:
                 self.__op_close()
-                copyfile(self.tempfile.absolute(), self.infile.absolute())
+                if self.compressed:
+                    compress_file(self.tempfile.absolute(), self.infile.absolute(), self.compressed.compression)
+                elif self.__windowed():
+                    fileops.copy_into(self.tempfile.absolute(), self.infile.absolute(), self.base_offset)
+                else:
+                    fileops.sparse_copyfile(self.tempfile.absolute(), self.infile.absolute())
                 self.__op_open()
+            elif self.compressed:
+                with memoryview(self.infile_cached) as memory:
+                    compress_file(io.BytesIO(memory), self.infile.absolute(), self.compressed.compression)
+            elif self.__windowed():
+                with self.infile.open("r+b") as infile:
+                    infile.seek(self.base_offset)
+                    infile.write(self.infile_cached)
             else:
                 self.infile.write_bytes(self.infile_cached)
+            self.unsaved_changes = False
         else:
             logging.info("No changes made. Nothing to do...")
 
+    def __reads_compressed(self) -> bool:
+        # Read only direct mode of a compressed file. Editable files are decompressed to the tempfile.
+        return self.compressed is not None and self.__direct_mode and not self.__editable
+
+    def __windowed(self) -> bool:
+        return self.base_offset != 0 or self.window_length is not None
+
+    def __reads_infile(self) -> bool:
+        # Are the reads made in the input file itself? Then the addresses are moved by the base offset. The cache
+        # and the tempfile hold only the window.
+        return self.__direct_mode and (not self.__editable or self.__direct_edit)
+
+    def __base(self) -> int:
+        return self.base_offset if self.__reads_infile() else 0
+
+    def __window(self, size: int) -> int:
+        # The size of the window in a file of the given size
+        size = max(0, size - self.base_offset)
+        return size if self.window_length is None else min(size, self.window_length)
+
+    def __check_window(self, stop: int) -> None:
+        if self.__windowed() and stop > len(self):
+            raise ValueError(f"The window ends at {len(self):08X} and can not grow.")
+
+    def _mapping(self) -> tuple:
+        """Returns the buffer, which holds the content of the file, and the position of the address 0 in it. In
+        direct mode this is a persistent, read only memory map of the opened file, in RAM mode it is the cached file
+        itself.
+
+        In a window of the input file, only the window is mapped. The map has to start at a multiple of
+        mmap.ALLOCATIONGRANULARITY, so the address 0 is not at the begin of the map. The map ends with the window.
+
+        Writes are made through the normal edit path and are visible in the memory map, because the file object is
+        flushed after every write. The memory map is closed by "close()".
+
+        :return: The buffer and the position of the address 0
+        :rtype: tuple
+        """
+        if not self.__direct_mode:
+            return self.infile_cached, 0
+        if self.__reads_compressed():
+            raise NotImplementedError("A compressed file, which is not editable, can not be mapped.")
+
+        size: int = len(self)
+        if size == 0:
+            return b'', 0  # Empty files can not be mapped
+        base: int = self.__base()
+        start: int = base - base % mmap.ALLOCATIONGRANULARITY
+        if self.memory_map is None or len(self.memory_map) != base - start + size:  # The file has changed its size
+            self.__close_mapping()
+            self.memory_map = mmap.mmap(self.infile_obj.fileno(), base - start + size, offset=start,
+                                        access=mmap.ACCESS_READ)
+        return self.memory_map, base - start
+
+    def view(self, start: int = 0, stop: int = -1) -> memoryview:
+        """The "view" method returns a memoryview of the range [start:stop] without copying it. In direct mode it
+        is a read only view on the memory map of the file. In RAM mode it is a view on the cached file, which is
+        writable, but must not be written to: Changes made through the view bypass the edit path and are neither
+        tracked nor saved. Use "hexedit[address] = value" instead.
+
+        Changes made with the edit path (e.g. "hexedit[address] = value") are visible in the view. The view is only
+        valid until "close()" (or "make_editable()") is called. Release it before that, with "view.release()" or by
+        using it in a with statement. A memory map, which is still in use, stays open until the last view on it is
+        released. Views created before the file has grown, still show the old size.
+
+        A compressed file, which is read only in direct mode, can not be mapped. The range is decompressed and the
+        view is made on the decompressed copy of it.
+
+        :param start: The start of the range. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop of the range. default = -1 (the end of the file)
+        :type stop: int
+        :return: The view of the range
+        :rtype: memoryview
+        """
+        if self.__reads_compressed():
+            stop = len(self) if stop == -1 else min(stop, len(self))
+            return memoryview(self.compressed.read(self.base_offset + start, max(0, stop - start)))
+
+        buffer, offset = self._mapping()
+        if stop == -1:
+            stop = len(buffer) - offset
+        with memoryview(buffer) as memory:
+            return memory[offset + start:offset + stop]
+
+    def __close_mapping(self) -> None:
+        if self.memory_map is not None:
+            try:
+                self.memory_map.close()
+            except BufferError:
+                # There are still views on the map. It will be closed, after the last one is released.
+                logging.warning("The memory map is still in use and can not be closed yet.")
+            self.memory_map = None
+
     def __op_close(self) -> None:
+        self.__close_mapping()
+        self.__extent_cache = None
+        if self.search_index is not None:
+            self.search_index.close()
+        if self.compressed is not None:
+            self.compressed.close()
         if self.infile_obj is not None:
             if not self.infile_obj.closed:
                 self.infile_obj.close()
@@ -266,26 +486,138 @@ class FileHandler(object):
         self.infile_obj = None
         self.infile_cached = None
 
-    def find(self, value: [str, bytes], start: int = 0, stop: int = -1) -> [int, None]:  # ToDo: Also implement regex
-        """The "find" method searches for an occurence of an defined string inside the file.
+    def extents(self, start: int = 0, stop: int = -1) -> list:
+        """The "extents" method returns the data and hole extents of the range [start:stop]. Holes are parts of a
+        sparse file, which are not stored on the drive and read as zeros. In RAM mode, for compressed files, which
+        are not editable, or if the system does not support it, the whole range is one data extent.
+
+        :param start: The start of the range. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop of the range. default = -1 (the end of the file)
+        :type stop: int
+        :return: The extents as (offset, length, data) tuples
+        :rtype: list
+        """
+        stop = len(self) if stop == -1 else min(stop, len(self))
+        if not self.__direct_mode or self.__reads_compressed():
+            return [fileops.Extent(start, stop - start, True)] if stop > start else []
+
+        size, offsets, extents = self.__file_extents()
+        selected: list = []
+        for extent in extents[max(0, bisect_right(offsets, start) - 1):]:
+            if extent.offset >= stop:
+                break
+            extent_start: int = max(start, extent.offset)
+            extent_stop: int = min(stop, extent.offset + extent.length)
+            if extent_stop > extent_start:
+                selected.append(fileops.Extent(extent_start, extent_stop - extent_start, extent.data))
+        return selected
+
+    def __file_extents(self) -> tuple:
+        # The extents of the whole file (or window) are cached, until the file is changed by the edit path or its
+        # size changes. Changes of other processes, which keep the size, are not seen.
+        size: int = len(self)
+        if self.__extent_cache is None or self.__extent_cache[0] != size:
+            self.__sync()
+            base: int = self.__base()
+            fd: int = self.infile_obj.fileno()
+            position: int = os.lseek(fd, 0, os.SEEK_CUR)  # The descriptor is shared with the file object
+            try:
+                extents: list = [fileops.Extent(extent.offset - base, extent.length, extent.data)
+                                 for extent in fileops.extents(fd, base, base + size)]
+            finally:
+                os.lseek(fd, position, os.SEEK_SET)
+            self.__extent_cache = (size, [extent.offset for extent in extents], extents)
+        return self.__extent_cache
+
+    def find(self, value: [str, bytes, BytePattern], start: int = 0, stop: int = -1) -> [int, None]:
+        """The "find" method searches for an occurence of an defined string inside the file. Holes of sparse files
+        are skipped, unless the value consists only of zeros. If the file is not editable and has an up to date
+        search index (see "build_search_index()"), only the ranges, which may contain the value, are scanned.
+
+        The value may also be a BytePattern with wildcards, nibble masks and gaps (see BytePattern).
 
         :param value: The value to search for.
         :param start: The start point of the search. default = 0 (begin of the file)
         :param stop: The stop point of the search. default = -1 (the end of the file)
         :return: The possition of the occured string
         """
+        if isinstance(value, BytePattern):
+            return value.find(self, start, stop)
         if type(value) == str:
             value = bytes(value, encoding=self.encoding)
-        if self.__direct_mode:
-            with mmap.mmap(self.infile_obj.fileno(), 0, access=mmap.ACCESS_READ) as memory_map:
-                ret: int = memory_map.find(value, start, stop)
-        else:
-            ret: int = self.infile_cached.find(value, start, stop)
-
-        if ret != -1:
-            return ret
-        else:
-            return None
+        stop = len(self) if stop == -1 else stop
+
+        ranges: [list, None] = None
+        if not self.__editable and not self.__windowed():
+            if self.search_index is None:
+                self.search_index = SearchIndex(self.infile)
+            if self.search_index.length == len(self):
+                ranges = self.search_index.candidates(value, start, stop)
+        if ranges is None:
+            ranges = [(start, stop)]
+
+        for range_start, range_stop in ranges:
+            ret: int = self.__find(value, range_start, range_stop)
+            if ret != -1:
+                return ret
+        return None
+
+    def __find(self, value: bytes, start: int, stop: int) -> int:
+        if self.__reads_compressed():
+            ret: int = self.compressed.find(value, self.base_offset + start,
+                                            self.base_offset + min(stop, len(self)))
+            return ret - self.base_offset if ret != -1 else -1
+
+        buffer, offset = self._mapping()
+        ranges: list = [(start, stop)]
+        if self.__direct_mode and any(value):
+            # A match can not lie completely inside of a hole, but may start or end in one
+            ranges = [(max(start, extent.offset - len(value) + 1),
+                       min(stop, extent.offset + extent.length + len(value) - 1))
+                      for extent in self.extents(start, stop) if extent.data]
+        for range_start, range_stop in ranges:
+            ret = buffer.find(value, offset + range_start, offset + range_stop)
+            if ret != -1:
+                return ret - offset
+        return -1
+
+    def build_search_index(self, block_size: int = BLOCK_SIZE) -> None:
+        """The "build_search_index" method builds the search index of the file and saves it next to the file (file
+        name + ".phi"). It is used by "find()" as long as the file is unchanged. Build it only for files, which are
+        searched often and not edited.
+
+        :param block_size: The bytes of the file per bigram set of the index. default = 256 KiB
+        :type block_size: int
+        :return: None
+        :rtype: None
+        """
+        if self.unsaved_changes:
+            raise NotEditableError("The file has unsaved changes. Save them, before the search index is build.")
+        if self.search_index is None:
+            self.search_index = SearchIndex(self.infile)
+        self.search_index.build(self, block_size)
+
+    def refresh(self) -> int:
+        """The "refresh" method makes data visible, which was appended to the file by another process, and returns
+        the new size. In direct mode, the size is just read again. In RAM mode, the appended data is read into the
+        cache, which fails with a BufferError, while there are views on the cache. Compressed files are not read
+        again.
+
+        :return: The size of the file
+        :rtype: int
+        """
+        if self.__editable:
+            raise NotImplementedError("An editable file is a copy of the input file and can not be refreshed.")
+        if self.compressed is None and not self.__direct_mode:
+            with self.infile.open("rb") as infile:
+                if os.fstat(infile.fileno()).st_size < self.base_offset + len(self.infile_cached):
+                    self.infile_cached.clear()  # The file got smaller, read it again
+                infile.seek(self.base_offset + len(self.infile_cached))
+                self.infile_cached += infile.read(self.__window(os.fstat(infile.fileno()).st_size)
+                                                  - len(self.infile_cached))
+        self.infile_size = len(self)
+        return self.infile_size
 
     def __len__(self) -> int:
         """Returns the length/size of the file.
@@ -293,10 +625,12 @@ class FileHandler(object):
         :return: The length/size of the file
         :rtype: None
         """
+        if self.__reads_compressed():
+            return self.__window(len(self.compressed))
         if self.__direct_mode:
             if not self.infile_obj.closed:  # Warning, the file might be changed after that.
                 self.infile_obj.seek(0, 2)
-                return self.infile_obj.tell()
+                return self.__window(self.infile_obj.tell()) if self.__reads_infile() else self.infile_obj.tell()
             else:
                 return self.infile_size
         else:
@@ -318,12 +652,14 @@ class FileHandler(object):
             if key.stop is None:
                 stop: int = len(self) - start
             else:
-                stop: int = key.stop - start
+                stop: int = max(0, min(key.stop, len(self)) - start)  # A window ends before the file
 
-            self.infile_obj.seek(start, 0)
+            if self.__reads_compressed():
+                return self.compressed.read(self.base_offset + start, stop)
+            self.infile_obj.seek(self.__base() + start, 0)
             return self.infile_obj.read(stop)
         else:
-            return self.infile_cached.__getitem__(key)
+            return bytes(self.infile_cached.__getitem__(key))
 
     def __setitem__(self, key, value) -> None:
         if type(key) == int:
@@ -338,27 +674,148 @@ class FileHandler(object):
         if type(value) == str:
             value: bytes = bytes(value, encoding=self.encoding)
 
-        if key.stop:
-            stop: int = key.stop - key.start
-            if len(value) != stop:  # Fill Mode (works for both bigfile and not bigfile mode)
-                value: int = (value * round((stop / len(value)) + 0.5))[:(stop)]
-        else:
-            stop: int = len(value)
+        if key.stop and len(value) != key.stop - key.start:  # Fill Mode (works for both bigfile and not bigfile mode)
+            self.fill(key.start, key.stop, value)
+            return
 
+        self.__write(key.start, value)
+        self.__sync()
+        self.unsaved_changes = True
+
+    def __write(self, address: int, value) -> None:
+        self.__check_window(address + len(value))
+        self.__extent_cache = None
         if self.__direct_mode:
-            self.infile_obj.seek(key.start, 0)
+            self.infile_obj.seek(self.__base() + address, 0)
             self.infile_obj.write(value)
         else:
-            self.infile_cached = self.infile_cached[:key.start] + value + \
-                                 self.infile_cached[(key.start + stop):]  # bytes: just to make sure
-        self.unsaved_changes = True
+            self.infile_cached[address:(address + len(value))] = value
 
-    def __bytes__(self) -> bytes:
+    def __sync(self) -> None:
         if self.__direct_mode:
-            self.infile_obj.seek(0)
-            return self.infile_obj.read()
+            # Makes the changes visible in the memory map and drops the read buffer, which might be outdated after
+            # an operation made by the kernel.
+            self.infile_obj.flush()
+
+    def __check_editable(self) -> None:
+        if not self.__editable:
+            raise NotEditableError(
+                "You have to add \"editable=True\" to your args or call the \"make_editable\" method, to edit the file.")
+
+    def fill(self, start: int, stop: int, pattern: [str, bytes] = b'\x00') -> None:
+        """The "fill" method fills the range [start:stop] with a repeated pattern. The range is written in chunks,
+        so the filled value is never build in memory. In direct mode, zeros are written by punching a hole into the
+        file, if the filesystem allows that.
+
+        :param start: The start of the range.
+        :type start: int
+        :param stop: The stop of the range.
+        :type stop: int
+        :param pattern: The pattern. default = b'\\x00'
+        :type pattern: [str, bytes]
+        :return: None
+        :rtype: None
+        """
+        self.__check_editable()
+        if type(pattern) == str:
+            pattern = bytes(pattern, encoding=self.encoding)
+        if not pattern:
+            raise ValueError("The fill pattern must not be empty.")
+        if stop <= start:
+            return
+        self.__check_window(stop)
+
+        self.unsaved_changes = True
+        if self.__direct_mode and not any(pattern):
+            self.__sync()
+            size: int = len(self)
+            self.__extent_cache = None
+            if start >= size or fileops.punch_hole(self.infile_obj.fileno(), self.__base() + start,
+                                                   min(stop, size) - start):
+                if stop > size:
+                    os.ftruncate(self.infile_obj.fileno(), stop)  # The grown part is a hole as well
+                self.__sync()
+                return
+
+        # The chunk holds the pattern a whole number of times, so it continues seamlessly in the next chunk
+        chunk: memoryview = memoryview(pattern * max(1, CHUNK_SIZE // len(pattern)))
+        for address in range(start, stop, len(chunk)):
+            self.__write(address, chunk[:stop - address])
+        self.__sync()
+
+    def copy(self, src: int, dst: int, length: int) -> None:
+        """The "copy" method copies the range [src:src + length] to dst. Overlapping ranges are handled like memmove
+        does it. In direct mode, the kernel copies the data, if the ranges do not overlap and the system allows it.
+        Otherwise it is copied in chunks. Holes in a non-overlapping source range are punched into the destination.
+
+        :param src: The start of the source range.
+        :type src: int
+        :param dst: The start of the destination range.
+        :type dst: int
+        :param length: The number of bytes.
+        :type length: int
+        :return: None
+        :rtype: None
+        """
+        self.__check_editable()
+        if src + length > len(self):
+            raise ValueError("The source range exceeds the end of the file.")
+        if length <= 0 or src == dst:
+            return
+        self.__check_window(dst + length)
+
+        self.unsaved_changes = True
+        if self.__direct_mode and (dst + length <= src or src + length <= dst):
+            # Holes of the source become holes in the destination
+            for extent in self.extents(src, src + length):
+                if extent.data:
+                    self.__copy(extent.offset, dst + extent.offset - src, extent.length)
+                else:
+                    self.fill(dst + extent.offset - src, dst + extent.offset - src + extent.length)
         else:
-            return self.infile_cached
+            self.__copy(src, dst, length)
+
+    def __copy(self, src: int, dst: int, length: int) -> None:
+        if self.__direct_mode and (dst + length <= src or src + length <= dst):
+            self.__sync()
+            self.__extent_cache = None
+            base: int = self.__base()
+            copied: int = fileops.copy_range(self.infile_obj.fileno(), self.infile_obj.fileno(), base + src, base + dst,
+                                             length)
+            src, dst, length = src + copied, dst + copied, length - copied
+
+        offsets: range = range(0, length, CHUNK_SIZE)
+        if src < dst < src + length:  # Copy from the end, so no source byte is overwritten before it was copied
+            offsets = reversed(offsets)
+        for offset in offsets:
+            size: int = min(CHUNK_SIZE, length - offset)
+            self.__write(dst + offset, self[src + offset:src + offset + size])
+        self.__sync()
+
+    def move(self, src: int, dst: int, length: int, fill: [str, bytes] = b'\x00') -> None:
+        """The "move" method moves the range [src:src + length] to dst. The part of the source range, which is not
+        overwritten by the moved range, is filled with "fill".
+
+        :param src: The start of the source range.
+        :type src: int
+        :param dst: The start of the destination range.
+        :type dst: int
+        :param length: The number of bytes.
+        :type length: int
+        :param fill: The pattern for the freed range. default = b'\\x00'
+        :type fill: [str, bytes]
+        :return: None
+        :rtype: None
+        """
+        self.copy(src, dst, length)
+        if dst > src:
+            self.fill(src, min(dst, src + length), fill)
+        elif dst < src:
+            self.fill(max(src, dst + length), src + length, fill)
+
+    def __bytes__(self) -> bytes:
+        with self.view() as memory:
+            return memory.tobytes()
 
     def __str__(self) -> str:
         return str(self.__bytes__().decode(self.encoding))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import errno
+import logging
+import os
+import platform
+from collections import namedtuple
+from pathlib import Path
+
+if platform.system() == 'Linux':
+    import ctypes
+    import ctypes.util
+
+__all__ = ['Extent', 'copy_into', 'copy_range', 'extents', 'punch_hole', 'sparse_copyfile']
+
+Extent = namedtuple('Extent', ['offset', 'length', 'data'])
+
+# Errors, which mean "the kernel/filesystem can't do this", not "something went wrong"
+_UNSUPPORTED: tuple = (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EXDEV)
+
+_FALLOC_FL_KEEP_SIZE: int = 0x01
+_FALLOC_FL_PUNCH_HOLE: int = 0x02
+
+_fallocate = None
+
+
+def _libc_fallocate():
+    global _fallocate
+    if _fallocate is None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _fallocate = libc.fallocate
+        _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+        _fallocate.restype = ctypes.c_int
+    return _fallocate
+
+
+def punch_hole(fd: int, offset: int, length: int) -> bool:
+    """Deallocates the range [offset:offset + length] of a file, without changing its size. The range reads as
+    zeros afterwards. This only works on Linux and on filesystems, which support sparse files.
+
+    :param fd: The file descriptor.
+    :type fd: int
+    :param offset: The start of the range.
+    :type offset: int
+    :param length: The length of the range.
+    :type length: int
+    :return: True, if the hole was punched, False if it is not supported
+    :rtype: bool
+    """
+    if platform.system() != 'Linux' or length <= 0:
+        return False
+    try:
+        fallocate = _libc_fallocate()
+    except (OSError, AttributeError):
+        return False
+    if fallocate(fd, _FALLOC_FL_PUNCH_HOLE | _FALLOC_FL_KEEP_SIZE, offset, length) != 0:
+        error: int = ctypes.get_errno()
+        if error in _UNSUPPORTED:
+            return False
+        raise OSError(error, os.strerror(error))
+    return True
+
+
+def copy_range(src_fd: int, dst_fd: int, src: int, dst: int, length: int) -> int:
+    """Copies the range [src:src + length] of one file to dst of another (or the same) file inside of the kernel,
+    without reading it into the userspace. The ranges must not overlap.
+
+    :param src_fd: The file descriptor of the source.
+    :type src_fd: int
+    :param dst_fd: The file descriptor of the destination.
+    :type dst_fd: int
+    :param src: The start of the range in the source.
+    :type src: int
+    :param dst: The start of the range in the destination.
+    :type dst: int
+    :param length: The number of bytes.
+    :type length: int
+    :return: The number of bytes copied. The rest has to be copied by the caller.
+    :rtype: int
+    """
+    if not hasattr(os, 'copy_file_range'):
+        return 0
+    copied: int = 0
+    try:
+        while copied < length:
+            count: int = os.copy_file_range(src_fd, dst_fd, length - copied, src + copied, dst + copied)
+            if count == 0:  # End of the source file
+                break
+            copied += count
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED:
+            raise
+        logging.debug(f"Kernel side copy is not supported: {e}")
+    return copied
+
+
+def extents(fd: int, start: int, stop: int):
+    """Generates the data and hole extents of the range [start:stop] of a file with SEEK_DATA and SEEK_HOLE. If
+    the system or the filesystem does not support that, the whole range is one data extent.
+
+    The file position of the file descriptor is changed. Use a descriptor, which is not used for reading and writing.
+
+    :param fd: The file descriptor.
+    :type fd: int
+    :param start: The start of the range.
+    :type start: int
+    :param stop: The stop of the range.
+    :type stop: int
+    :return: The extents
+    :rtype: Iterator[Extent]
+    """
+    if not hasattr(os, 'SEEK_DATA'):
+        if stop > start:
+            yield Extent(start, stop - start, True)
+        return
+
+    offset: int = start
+    while offset < stop:
+        try:
+            data: int = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # There is no more data after the offset
+                yield Extent(offset, stop - offset, False)
+                return
+            if e.errno not in _UNSUPPORTED:
+                raise
+            yield Extent(offset, stop - offset, True)
+            return
+        if data > offset:
+            yield Extent(offset, min(data, stop) - offset, False)
+        if data >= stop:
+            return
+        hole: int = os.lseek(fd, data, os.SEEK_HOLE)
+        yield Extent(data, min(hole, stop) - data, True)
+        offset = hole
+
+
+def _copy_chunks(fsrc, fdst, src: int, dst: int, length: int, chunk_size: int) -> None:
+    copied: int = copy_range(fsrc.fileno(), fdst.fileno(), src, dst, length)
+    fsrc.seek(src + copied)
+    fdst.seek(dst + copied)
+    while copied < length:
+        chunk: bytes = fsrc.read(min(chunk_size, length - copied))
+        if not chunk:
+            break
+        fdst.write(chunk)
+        copied += len(chunk)
+
+
+def sparse_copyfile(src: [Path, str], dst: [Path, str], chunk_size: int = 1 << 20, start: int = 0,
+                    length: int = None) -> None:
+    """Copies a file like shutil.copyfile does, but keeps the holes of sparse files. Only the data extents are
+    copied, the holes are created by truncating the destination to the size of the source.
+
+    With start and length, only the range [start:start + length] of the source is copied to the begin of the
+    destination.
+
+    :param src: The source file.
+    :type src: [Path, str]
+    :param dst: The destination file.
+    :type dst: [Path, str]
+    :param chunk_size: The number of bytes copied at once, if the kernel can not copy the data.
+    :type chunk_size: int
+    :param start: The start of the copied range. default = 0 (begin of the file)
+    :type start: int
+    :param length: The length of the copied range. default = None (up to the end of the file)
+    :type length: int
+    :return: None
+    :rtype: None
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size: int = max(0, os.fstat(fsrc.fileno()).st_size - start)
+        if length is not None:
+            size = min(size, length)
+        for extent in extents(fsrc.fileno(), start, start + size):
+            if extent.data:
+                _copy_chunks(fsrc, fdst, extent.offset, extent.offset - start, extent.length, chunk_size)
+        fdst.truncate(size)
+
+
+def copy_into(src: [Path, str], dst: [Path, str], offset: int, chunk_size: int = 1 << 20) -> None:
+    """Copies the whole file src into the existing file dst at offset. Unlike sparse_copyfile, dst is not truncated
+    and the holes of src are written as zeros.
+
+    :param src: The source file.
+    :type src: [Path, str]
+    :param dst: The destination file.
+    :type dst: [Path, str]
+    :param offset: The address in the destination.
+    :type offset: int
+    :param chunk_size: The number of bytes copied at once, if the kernel can not copy the data.
+    :type chunk_size: int
+    :return: None
+    :rtype: None
+    """
+    with open(src, "rb") as fsrc, open(dst, "r+b") as fdst:
+        _copy_chunks(fsrc, fdst, 0, offset, os.fstat(fsrc.fileno()).st_size, chunk_size)
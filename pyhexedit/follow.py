@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import logging
+import os
+import platform
+import select
+import time
+from pathlib import Path
+
+if platform.system() == 'Linux':
+    import ctypes
+    import ctypes.util
+
+__all__ = ['growth']
+
+_IN_MODIFY: int = 0x002
+_IN_ATTRIB: int = 0x004
+_IN_CLOSE_WRITE: int = 0x008
+_IN_NONBLOCK: int = 0o4000  # O_NONBLOCK of Linux, os.O_NONBLOCK does not exist on Windows
+_IN_CLOEXEC: int = 0o2000000
+
+
+class _Watch(object):
+    def __init__(self, file: Path) -> None:
+        # Waits for changes of the file with inotify on Linux. Otherwise (or if inotify fails) wait() just sleeps
+        # and the caller polls the size.
+        self.fd: int = -1
+        if platform.system() != 'Linux':
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd: int = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            if libc.inotify_add_watch(fd, os.fsencode(file), _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            self.fd = fd
+        except (OSError, AttributeError) as e:
+            logging.debug(f"inotify is not available, the size is polled: {e}")
+
+    def wait(self, interval: float) -> None:
+        if self.fd < 0:
+            time.sleep(interval)
+            return
+        if select.select([self.fd], [], [], interval)[0]:
+            try:
+                while os.read(self.fd, 4096):  # Drop the events, the size is checked anyway
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def growth(handler, start: int = 0, interval: float = 0.5, timeout: float = None):
+    """Follows a file, which grows, like "tail -f" does. Generates a (previous, size) tuple every time the file
+    grew, where [previous:size] is the appended range. The first tuple is generated at once, if the file is already
+    bigger than start.
+
+    On Linux, the generator sleeps until inotify reports a change of the file, but at most "interval" seconds. On
+    other systems, the size is polled every "interval" seconds. If the file gets smaller (e.g. truncated by a log
+    rotation), previous is 0 in the next tuple.
+
+    :param handler: The FileHandler of the file. It must not be editable.
+    :type handler: FileHandler
+    :param start: The size, which is known already. default = 0 (the whole file is new)
+    :type start: int
+    :param interval: The maximum seconds between two checks of the size. default = 0.5
+    :type interval: float
+    :param timeout: Stop after this many seconds without growth. default = None (follow forever)
+    :type timeout: float
+    :return: The (previous, size) tuples
+    :rtype: Iterator[tuple]
+    """
+    previous: int = start
+    known: int = handler.refresh()
+    changed: float = time.monotonic()
+    watch: _Watch = _Watch(handler.infile)
+    try:
+        while True:
+            size: int = handler.refresh()
+            if size < known:
+                logging.warning(f"\"{handler.infile}\" got smaller. Following it from the begin.")
+                previous = 0
+            known = size
+
+            if size > previous:
+                yield previous, size
+                previous = size
+                changed = time.monotonic()
+            elif timeout is not None and time.monotonic() - changed >= timeout:
+                return
+            else:
+                watch.wait(interval if timeout is None else min(interval, timeout))
+    finally:
+        watch.close()
@@ -21,16 +21,30 @@ __email__ = "Michael@MichaelSasser.de"
 
 from pathlib import Path
 
+from pyhexedit.exporter import export
 from pyhexedit.filehandler import FileHandler
+from pyhexedit.follow import growth
+from pyhexedit.multifile import MultiFileHandler
+from pyhexedit.pattern import BytePattern
+from pyhexedit.records import RecordLayout, RecordView
+from pyhexedit.searchindex import BLOCK_SIZE
+from pyhexedit.strings import extract_strings
+from pyhexedit.valuescan import scan_values
+from pyhexedit.viewer import Viewer
 
 __all__ = ['PyHexedit']
 
+# Bytes, which are viewed at once by pprint. Compressed files are only decompressed window by window.
+PPRINT_WINDOW: int = 1 << 16
+# Bytes of the appended data, which are read at once by follow_bytes
+FOLLOW_CHUNK_SIZE: int = 1 << 20
+
 
 class PyHexedit(object):  # Don't make this to a child of FileHandler.
     instances: int = 0
     escapes: dict = {n: '.' for n in range(1, 32)}
 
-    def __init__(self, file: [Path, str],
+    def __init__(self, file: [Path, str, list],
                  outputfile: [Path, str] = None,
                  editable: bool = False,
                  filetype: str = "bin",
@@ -39,17 +53,36 @@ class PyHexedit(object):  # Don't make this to a child of FileHandler.
                  auto_bigfile_mode: bool = False,
                  encoding: str = "utf8",
                  bytes_per_line: int = 16,
-                 direct_edit: bool = False) -> None:
+                 direct_edit: bool = False,
+                 compression: str = "auto",
+                 base_offset: int = 0,
+                 length: int = None) -> None:
         PyHexedit.instances += 1
-        self.handler: FileHandler = FileHandler(file=file,
-                                                outputfile=outputfile,
-                                                editable=editable,
-                                                filetype=filetype,
-                                                direct_mode=bigfile_mode,
-                                                auto_inram_mode=auto_bigfile_mode,
-                                                encoding=encoding,
-                                                bytes_per_line=bytes_per_line,
-                                                infile_edit=direct_edit)
+        if isinstance(file, (list, tuple)) and len(file) > 1:  # Parts of one file
+            if outputfile or base_offset or length is not None:
+                raise NotImplementedError("Multiple files can not be opened with an output file or as window.")
+            self.handler: [FileHandler, MultiFileHandler] = MultiFileHandler(files=file,
+                                                                             editable=editable,
+                                                                             filetype=filetype,
+                                                                             direct_mode=bigfile_mode,
+                                                                             auto_inram_mode=auto_bigfile_mode,
+                                                                             encoding=encoding,
+                                                                             bytes_per_line=bytes_per_line,
+                                                                             infile_edit=direct_edit,
+                                                                             compression=compression)
+        else:
+            self.handler = FileHandler(file=file[0] if isinstance(file, (list, tuple)) else file,
+                                       outputfile=outputfile,
+                                       editable=editable,
+                                       filetype=filetype,
+                                       direct_mode=bigfile_mode,
+                                       auto_inram_mode=auto_bigfile_mode,
+                                       encoding=encoding,
+                                       bytes_per_line=bytes_per_line,
+                                       infile_edit=direct_edit,
+                                       compression=compression,
+                                       base_offset=base_offset,
+                                       length=length)
 
         if auto_open:
             self.open()
@@ -63,13 +96,13 @@ class PyHexedit(object):  # Don't make this to a child of FileHandler.
     def save(self):
         self.handler.save()
 
-    def find(self, value: [str, bytes], begin: int = 0, end: int = -1, pprint: bool = False) -> [int, None]:
+    def find(self, value: [str, bytes, BytePattern], begin: int = 0, end: int = -1, pprint: bool = False) -> [int, None]:
         found: int = self.handler.find(value, begin, end)
         if pprint:
             self.pprint_around(found)
         return found
 
-    def find_all(self, value: [str, bytes], begin: int = 0, end: int = -1, pprint: bool = False) -> tuple:
+    def find_all(self, value: [str, bytes, BytePattern], begin: int = 0, end: int = -1, pprint: bool = False) -> tuple:
         eof: int = end if end != -1 else self.__len__()
         found: list = []
         start_next: int = begin
@@ -83,6 +116,198 @@ class PyHexedit(object):  # Don't make this to a child of FileHandler.
             start_next = hit + 1
         return tuple(found)
 
+    def scan_values(self, type_: str, value=None, minimum=None, maximum=None, tolerance=None,
+                    byteorder: str = "little", alignment: int = 1, begin: int = 0, end: int = -1,
+                    pprint: bool = False):
+        """Scans the file for numbers of a type at every (aligned) address and generates the addresses of the
+        matching numbers in ascending order (see valuescan.scan_values).
+
+        :param type_: The type of the numbers: u8, i8, u16, i16, u32, i32, u64, i64, f16, f32, f64
+        :type type_: str
+        :param value: The exact value. With tolerance, the range [value - tolerance:value + tolerance]. default = None
+        :param minimum: The minimum value (inclusive). default = None (no lower limit)
+        :param maximum: The maximum value (inclusive). default = None (no upper limit)
+        :param tolerance: The tolerance of value. default = None (exact)
+        :param byteorder: The byteorder: little/big. default = 'little'
+        :type byteorder: str
+        :param alignment: Only addresses, which are a multiple of this, are scanned. default = 1 (every address)
+        :type alignment: int
+        :param begin: The first address. default = 0
+        :type begin: int
+        :param end: The end of the range. default = -1 (the end of the file)
+        :type end: int
+        :param pprint: Print the lines around every match? default = False
+        :type pprint: bool
+        :return: The addresses
+        :rtype: Iterator[int]
+        """
+        for found in scan_values(self.handler, type_, value, minimum, maximum, tolerance, byteorder, alignment,
+                                 begin, end):
+            if pprint:
+                self.pprint_around(found)
+            yield found
+
+    def strings(self, min_length: int = 4, encodings: [list, tuple] = ('ascii',), begin: int = 0, end: int = -1,
+                pprint: bool = False):
+        """Extracts the strings of the file, like the "strings" utility does, and generates them as
+        String(address, encoding, text) tuples in the order of their addresses (see strings.extract_strings).
+
+        :param min_length: The minimum number of characters of a string. default = 4
+        :type min_length: int
+        :param encodings: The encodings: ascii, utf8, utf16le, utf16be. default = ('ascii',)
+        :type encodings: [list, tuple]
+        :param begin: The first address. default = 0
+        :type begin: int
+        :param end: The end of the range. default = -1 (the end of the file)
+        :type end: int
+        :param pprint: Print the lines around every string? default = False
+        :type pprint: bool
+        :return: The strings
+        :rtype: Iterator[String]
+        """
+        for found in extract_strings(self.handler, min_length, encodings, begin, end):
+            if pprint:
+                self.pprint_around(found.address)
+            yield found
+
+    def build_search_index(self, block_size: int = BLOCK_SIZE) -> None:
+        self.handler.build_search_index(block_size)
+
+    def follow(self, begin: int = 0, lines: int = 16, charset: str = "ANSI", interval: float = 0.5,
+               timeout: float = None) -> None:
+        """Prints the file from begin on and then the data, which is appended by other processes, like "tail -f".
+        Only complete lines are printed. The last, incomplete line is printed, when it is complete or when following
+        ends (timeout or KeyboardInterrupt).
+
+        :param begin: The first address. default = 0
+        :type begin: int
+        :param lines: The lines to print before the next headline. default = 16
+        :type lines: int
+        :param charset: The charset. default = 'ANSI'
+        :type charset: str
+        :param interval: The maximum seconds between two checks of the size. default = 0.5
+        :type interval: float
+        :param timeout: Stop after this many seconds without growth. default = None (follow forever)
+        :type timeout: float
+        :return: None
+        :rtype: None
+        """
+        printed: int = begin  # The address of the first line, which is not printed yet
+        headline: bool = True
+        try:
+            for previous, size in growth(self.handler, begin, interval, timeout):
+                if previous < printed:  # The file got smaller
+                    printed = previous - previous % self.handler.bytes_per_line
+                complete: int = size - size % self.handler.bytes_per_line
+                if complete > printed:
+                    self.pprint(printed, complete, lines, charset, headline)
+                    printed, headline = complete, False
+        finally:
+            if len(self) > printed:
+                self.pprint(printed, len(self), lines, charset, headline)
+
+    def follow_bytes(self, begin: int = 0, interval: float = 0.5, timeout: float = None):
+        """Generates the raw bytes of the file from begin on and then the data, which is appended by other processes,
+        like "tail -c +begin -f". The data is read in chunks of at most FOLLOW_CHUNK_SIZE bytes. If the file gets
+        smaller, it is generated again from the begin.
+
+        :param begin: The first address. default = 0
+        :type begin: int
+        :param interval: The maximum seconds between two checks of the size. default = 0.5
+        :type interval: float
+        :param timeout: Stop after this many seconds without growth. default = None (follow forever)
+        :type timeout: float
+        :return: The data
+        :rtype: Iterator[bytes]
+        """
+        for previous, size in growth(self.handler, begin, interval, timeout):
+            for address in range(previous, size, FOLLOW_CHUNK_SIZE):
+                yield self.handler[address:min(size, address + FOLLOW_CHUNK_SIZE)]
+
+    def follow_find_all(self, value: [str, bytes, BytePattern], begin: int = 0, pprint: bool = False, interval: float = 0.5,
+                        timeout: float = None):
+        """Searches the file from begin on and then the data, which is appended by other processes. Generates every
+        occurrence, as soon as it is complete in the file. Matches, which are split across two appends, are found
+        as well.
+
+        :param value: The value to search for.
+        :type value: [str, bytes, BytePattern]
+        :param begin: The first address. default = 0
+        :type begin: int
+        :param pprint: Print the lines around every occurrence? default = False
+        :type pprint: bool
+        :param interval: The maximum seconds between two checks of the size. default = 0.5
+        :type interval: float
+        :param timeout: Stop after this many seconds without growth. default = None (follow forever)
+        :type timeout: float
+        :return: The addresses of the occurrences
+        :rtype: Iterator[int]
+        """
+        if type(value) == str:
+            value = bytes(value, encoding=self.handler.encoding)
+        searched: int = begin  # No match starts before this address, which is not found yet
+        for previous, size in growth(self.handler, begin, interval, timeout):
+            if previous < searched:  # The file got smaller
+                searched = previous
+            while True:
+                hit: int = self.find(value, searched, size, pprint)
+                if hit is None:
+                    break
+                yield hit
+                searched = hit + 1
+            # A match, which starts after that, is not complete yet
+            searched = max(searched, size - len(value) + 1)
+
+    def interactive(self) -> None:
+        """Opens the interactive terminal viewer (see Viewer).
+
+        :return: None
+        :rtype: None
+        """
+        Viewer(self).run()
+
+    def fill(self, begin: int, end: int, pattern: [str, bytes] = b'\x00') -> None:
+        self.handler.fill(begin, end, pattern)
+
+    def copy(self, src: int, dst: int, length: int) -> None:
+        self.handler.copy(src, dst, length)
+
+    def move(self, src: int, dst: int, length: int, fill: [str, bytes] = b'\x00') -> None:
+        self.handler.move(src, dst, length, fill)
+
+    def view(self, begin: int = 0, end: int = -1) -> memoryview:
+        """Returns a memoryview of the range [begin:end] without copying it. See FileHandler.view for the lifetime
+        of the view and why it must not be written to."""
+        return self.handler.view(begin, end)
+
+    def export(self, fmt: str, file=None, begin: int = 0, end: int = -1, name: str = None,
+               bytes_per_line: int = None) -> int:
+        """Streams the range [begin:end] as C array, Rust/Python byte literal, base64 or xxd text to a file.
+
+        :param fmt: The format: c/rust/python/base64/xxd
+        :param file: The output file. A path, a binary file object or None for stdout. default = None
+        :param begin: The start of the range. default = 0 (begin of the file)
+        :param end: The end of the range. default = -1 (the end of the file)
+        :param name: The variable name used by c/rust/python. default = the name of the input file
+        :param bytes_per_line: The number of bytes per line. default = depends on the format
+        :return: The number of bytes exported
+        """
+        return export(self.handler, fmt, file, begin, end, name or self.handler.infile.name, bytes_per_line)
+
+    def records(self, layout: [RecordLayout, list], offset: int = 0, count: int = None,
+                byteorder: str = "little") -> RecordView:
+        """Maps the file from "offset" on as array of records, without copying it.
+
+        :param layout: The RecordLayout or a list of (name, type) tuples (see RecordLayout).
+        :param offset: The address of the first record. default = 0 (begin of the file)
+        :param count: The number of records. default = None (as many as fit into the file)
+        :param byteorder: The byteorder, if the layout is a list: little/big. default = 'little'
+        :return: The RecordView
+        """
+        if not isinstance(layout, RecordLayout):
+            layout = RecordLayout(layout, byteorder)
+        return RecordView(self.handler, layout, offset, count)
+
     def pprint_around(self, address: int, line_above: int = 2, line_below: int = 3, charset: str = "ANSI") -> None:
         if type(address) == int:
             print(f"< Found: at Address: {address:08X} >")
@@ -97,34 +322,60 @@ class PyHexedit(object):  # Don't make this to a child of FileHandler.
             # Todo
             pass
 
-    def pprint(self, begin: int = None, end: int = None, lines: int = 16, charset: str = "ANSI") -> None:
+    def pprint(self, begin: int = None, end: int = None, lines: int = 16, charset: str = "ANSI",
+               headline: bool = True) -> None:
         # ToDo: Create a buffer/generator, don't print. The User should print himselfe
         begin: int = int(begin) if begin is not None else 0
         end: int = int(end) if end != -1 else self.handler.__len__()
         empty: int = 0 if begin == 0 else begin % self.handler.bytes_per_line
 
-        headline: str = "Offset(h) | "
+        headline_text: str = "Offset(h) | "
         for i in range(self.handler.bytes_per_line):
-            headline += f" {i:02X}"
-        headline += f"  |  {charset.center(self.handler.bytes_per_line, ' ')}"
-        headline += '\n' + '-' * len(headline)
+            headline_text += f" {i:02X}"
+        headline_text += f"  |  {charset.center(self.handler.bytes_per_line, ' ')}"
+        headline_text += '\n' + '-' * len(headline_text)
 
         printed_lines: int = 0
         last_start: int = begin
         run: bool = True
+        window: int = max(PPRINT_WINDOW, self.handler.bytes_per_line)
+        memory_start: int = begin
+        memory: memoryview = self.handler.view(begin, min(end, begin + window))  # One view for many lines
+        holes: list = [extent for extent in self.handler.extents(begin, end) if not extent.data]
         while run:
 
-            if printed_lines % lines == 0:
-                print(headline)
+            if printed_lines % lines == 0 and headline:
+                print(headline_text)
+
+            # Full lines inside of a hole of a sparse file are collapsed into a single line
+            while holes and holes[0].offset + holes[0].length <= last_start:
+                holes.pop(0)
+            if not empty and holes and holes[0].offset <= last_start:
+                hole_end: int = holes[0].offset + holes[0].length
+                skip_to: int = hole_end - hole_end % self.handler.bytes_per_line if hole_end < end else end
+                if skip_to - last_start >= 2 * self.handler.bytes_per_line:
+                    print(f"{last_start:08X}  | *** hole: {skip_to - last_start} (0x{skip_to - last_start:X}) bytes "
+                          f"of zeros up to {skip_to:08X} ***")
+                    if printed_lines % lines == lines - 1:  # A line between
+                        print()
+                    printed_lines += 1
+                    last_start = skip_to
+                    run = last_start < end
+                    continue
+
             # address = start + printed_lines
             next_end: int = last_start + self.handler.bytes_per_line - empty
             #print("LAST NEXT END: ", last_start, next_end, end)
             print(f"{last_start:08X}  | " + ' ' * 3 * empty, end='')
 
+            if min(next_end, end) > memory_start + len(memory):  # The line is not in the current window
+                memory.release()
+                memory_start = last_start
+                memory = self.handler.view(last_start, min(end, last_start + window))
             if next_end < end:
-                chars: bytes = bytes(self[last_start:next_end])
+                chars: memoryview = memory[last_start - memory_start:next_end - memory_start]
             elif next_end >= end:
-                chars: bytes = bytes(self[last_start:end])
+                chars: memoryview = memory[last_start - memory_start:end - memory_start]
                 run = False
             else:
                 raise (RuntimeError("This Error should never happen."))
@@ -143,6 +394,7 @@ class PyHexedit(object):  # Don't make this to a child of FileHandler.
             printed_lines += 1
             last_start = next_end
             empty = 0
+        memory.release()
 
     def __getitem__(self, key):
         return self.handler.__getitem__(key)
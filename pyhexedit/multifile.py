@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+
+from pyhexedit.filehandler import CHUNK_SIZE, FileHandler, NotEditableError
+from pyhexedit.pattern import BytePattern
+
+__all__ = ['MultiFileHandler']
+
+MAX_OPEN_PARTS: int = 16
+
+
+class MultiFileHandler(object):
+    def __init__(self, files: list,
+                 editable: bool = False,
+                 filetype: str = "bin",
+                 direct_mode: bool = True,
+                 auto_inram_mode: bool = True,
+                 encoding: str = "utf8",
+                 bytes_per_line: int = 16,
+                 infile_edit: bool = False,
+                 compression: str = None,
+                 max_open: int = MAX_OPEN_PARTS) -> None:
+        """The MultiFileHandler opens an ordered list of files (e.g. "part.000", "part.001", ...) as one file. It
+        offers the same operations as the FileHandler and can be used in its place.
+
+        Every part has its own FileHandler, which is opened, when the part is used first. At most "max_open" parts
+        are opened at once, the least recently used one is closed first. Parts with unsaved changes stay open until
+        they are saved. Reads, searches and edits, which cross the border of a part, are split between the parts.
+        The parts can not grow.
+
+        :param files: The parts in their order.
+        :type files: list
+        :param editable: Should the parts be opened editable? default = False
+        :type editable: bool
+        :param filetype: The type of the parts: bin/intel. default = 'bin'
+        :type filetype: str
+        :param direct_mode: Should the parts be opened in direct mode? (see FileHandler)
+        :type direct_mode: bool
+        :param auto_inram_mode: Should an algorithm choose which mode should be used for every part?
+        :type auto_inram_mode: bool
+        :param encoding: The encoding of the file. default = 'utf8'
+        :type encoding: str
+        :param bytes_per_line: The number of bytes per line.
+        :type bytes_per_line: int
+        :param infile_edit: infile edit for direct mode (see FileHandler).
+        :type infile_edit: bool
+        :param compression: The compression of every part: gzip/xz/zstd or None. It is not detected ("auto" is
+                            the same as None), because the parts of a split compressed file are not compressed
+                            files themselves. default = None
+        :type compression: str
+        :param max_open: The maximum number of open parts. default = 16
+        :type max_open: int
+        :return: None
+        :rtype: None
+        """
+        if not files:
+            raise ValueError("At least one file is needed.")
+        if compression == "auto":
+            compression = None
+        self.parts: list = [FileHandler(file, filetype=filetype, direct_mode=direct_mode,
+                                        auto_inram_mode=auto_inram_mode, encoding=encoding,
+                                        bytes_per_line=bytes_per_line, infile_edit=infile_edit,
+                                        compression=compression) for file in files]
+        self.infile: Path = self.parts[0].infile
+        self.encoding: str = encoding
+        self.bytes_per_line: int = bytes_per_line
+        self.max_open: int = max(1, max_open)
+
+        self.offsets: list = []  # The address of every part
+        offset: int = 0
+        for part in self.parts:
+            self.offsets.append(offset)
+            offset += part.infile_size
+        self.size: int = offset
+
+        self.__editable: bool = editable
+        self.__infile_edit: bool = None  # As given to "make_editable()"
+        self.__opened: OrderedDict = OrderedDict()
+
+    @property
+    def unsaved_changes(self) -> bool:
+        return any(part.unsaved_changes for part in self.__opened.values())
+
+    def __part(self, index: int) -> FileHandler:
+        # Returns the opened FileHandler of a part and closes the least recently used ones.
+        part: FileHandler = self.__opened.get(index)
+        if part is not None:
+            self.__opened.move_to_end(index)
+            return part
+
+        part = self.parts[index]
+        part.open()
+        if self.__editable:
+            part.make_editable(self.__infile_edit)
+        self.__opened[index] = part
+        for opened in list(self.__opened)[:-1]:  # Not the requested part
+            if len(self.__opened) <= self.max_open:
+                break
+            if not self.__opened[opened].unsaved_changes:
+                self.__opened.pop(opened).close()
+        return part
+
+    def __split(self, start: int, stop: int):
+        # Generates (part index, local start, local stop, address) for every part in the range [start:stop]
+        index: int = max(0, bisect_right(self.offsets, start) - 1)
+        while index < len(self.parts) and self.offsets[index] < stop:
+            offset: int = self.offsets[index]
+            local_start: int = max(start, offset) - offset
+            local_stop: int = min(stop, offset + self.parts[index].infile_size) - offset
+            if local_stop > local_start:
+                yield index, local_start, local_stop, offset + local_start
+            index += 1
+
+    def __range(self, start: [int, None], stop: [int, None]) -> tuple:
+        start = 0 if start is None else start
+        stop = self.size if stop is None or stop == -1 else min(stop, self.size)
+        return start, stop
+
+    def open(self) -> None:
+        pass  # The parts are opened, when they are used
+
+    def close(self) -> None:
+        while self.__opened:
+            self.__opened.popitem()[1].close()
+
+    def make_editable(self, infile_edit: bool = None) -> None:
+        """The "make_editable()" method makes the parts editable. Parts, which are not opened yet, are made
+        editable, when they are opened.
+
+        :param infile_edit: Edit the parts in place (see FileHandler)? default = None (as given to the constructor)
+        :type infile_edit: bool
+        :return: None
+        :rtype: None
+        """
+        self.__editable = True
+        self.__infile_edit = infile_edit
+        for part in self.__opened.values():
+            part.make_editable(infile_edit)
+
+    def edit_copy_size(self) -> int:
+        """Returns the number of bytes, which "make_editable()" copies to the tempfiles of the parts (see
+        FileHandler). Parts, which are not opened yet, are copied, when they are opened.
+
+        :return: The number of bytes
+        :rtype: int
+        """
+        return 0 if self.__editable else sum(part.edit_copy_size() for part in self.parts)
+
+    def save(self) -> None:
+        """The "save()" method saves the changes of every part.
+
+        :return: None
+        :rtype: None
+        """
+        if not self.__editable:
+            raise NotEditableError("The file is not editable and can not be saved.")
+        for part in self.__opened.values():
+            if part.unsaved_changes:
+                part.save()
+
+    def view(self, start: int = 0, stop: int = -1) -> memoryview:
+        """The "view" method returns a memoryview of the range [start:stop]. If the range lies in one part, it is the
+        view of that part (see FileHandler.view), otherwise a read only view on a copy of the range.
+
+        :param start: The start of the range. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop of the range. default = -1 (the end of the file)
+        :type stop: int
+        :return: The view of the range
+        :rtype: memoryview
+        """
+        start, stop = self.__range(start, stop)
+        pieces: list = list(self.__split(start, stop))
+        if len(pieces) == 1:
+            index, local_start, local_stop, _ = pieces[0]
+            return self.__part(index).view(local_start, local_stop)
+        return memoryview(self[start:stop])
+
+    def extents(self, start: int = 0, stop: int = -1) -> list:
+        """The "extents" method returns the data and hole extents of the range [start:stop] (see
+        FileHandler.extents).
+
+        :param start: The start of the range. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop of the range. default = -1 (the end of the file)
+        :type stop: int
+        :return: The extents as (offset, length, data) tuples
+        :rtype: list
+        """
+        start, stop = self.__range(start, stop)
+        return [extent._replace(offset=extent.offset + self.offsets[index])
+                for index, local_start, local_stop, _ in self.__split(start, stop)
+                for extent in self.__part(index).extents(local_start, local_stop)]
+
+    def find(self, value: [str, bytes, BytePattern], start: int = 0, stop: int = -1) -> [int, None]:
+        """The "find" method searches for an occurence of an defined string inside the file. Every part is searched
+        by its own FileHandler. Occurrences across the border of two (or more) parts are searched in a copy of the
+        bytes around the border. A BytePattern is searched by its anchor (see BytePattern).
+
+        :param value: The value to search for.
+        :param start: The start point of the search. default = 0 (begin of the file)
+        :param stop: The stop point of the search. default = -1 (the end of the file)
+        :return: The possition of the occured string
+        """
+        if isinstance(value, BytePattern):
+            return value.find(self, start, stop)
+        if type(value) == str:
+            value = bytes(value, encoding=self.encoding)
+        start, stop = self.__range(start, stop)
+        for index, local_start, local_stop, address in self.__split(start, stop):
+            found: [int, None] = self.__part(index).find(value, local_start, local_stop)
+            if found is not None:
+                return self.offsets[index] + found
+
+            # Occurrences, which start in this part and end in a later one
+            end: int = self.offsets[index] + self.parts[index].infile_size
+            border_start: int = max(start, end - len(value) + 1)
+            border: bytes = self[border_start:min(stop, end + len(value) - 1)]
+            found = border.find(value, 0, end - border_start + len(value) - 1)
+            if found != -1:
+                return border_start + found
+        return None
+
+    def refresh(self) -> int:
+        return self.size  # The parts can not grow
+
+    def build_search_index(self, block_size: int = None) -> None:
+        raise NotImplementedError("The search index is not implemented for multiple files.")
+
+    def fill(self, start: int, stop: int, pattern: [str, bytes] = b'\x00') -> None:
+        """The "fill" method fills the range [start:stop] with a repeated pattern (see FileHandler.fill). The pattern
+        continues seamlessly in the next part.
+
+        :param start: The start of the range.
+        :type start: int
+        :param stop: The stop of the range.
+        :type stop: int
+        :param pattern: The pattern. default = b'\\x00'
+        :type pattern: [str, bytes]
+        :return: None
+        :rtype: None
+        """
+        if type(pattern) == str:
+            pattern = bytes(pattern, encoding=self.encoding)
+        if not pattern:
+            raise ValueError("The fill pattern must not be empty.")
+        self.__check(stop)
+        for index, local_start, local_stop, address in self.__split(start, stop):
+            shift: int = (address - start) % len(pattern)
+            self.__part(index).fill(local_start, local_stop, pattern[shift:] + pattern[:shift])
+
+    def copy(self, src: int, dst: int, length: int) -> None:
+        """The "copy" method copies the range [src:src + length] to dst (see FileHandler.copy). If both ranges lie in
+        the same part, the part copies it, otherwise it is copied in chunks.
+
+        :param src: The start of the source range.
+        :type src: int
+        :param dst: The start of the destination range.
+        :type dst: int
+        :param length: The number of bytes.
+        :type length: int
+        :return: None
+        :rtype: None
+        """
+        if src + length > self.size:
+            raise ValueError("The source range exceeds the end of the file.")
+        if length <= 0 or src == dst:
+            return
+        self.__check(dst + length)
+
+        sources: list = list(self.__split(src, src + length))
+        destinations: list = list(self.__split(dst, dst + length))
+        if len(sources) == 1 and len(destinations) == 1 and sources[0][0] == destinations[0][0]:
+            self.__part(sources[0][0]).copy(sources[0][1], destinations[0][1], length)
+            return
+
+        offsets: range = range(0, length, CHUNK_SIZE)
+        if src < dst < src + length:  # Copy from the end, so no source byte is overwritten before it was copied
+            offsets = reversed(offsets)
+        for offset in offsets:
+            size: int = min(CHUNK_SIZE, length - offset)
+            self[dst + offset:dst + offset + size] = self[src + offset:src + offset + size]
+
+    def move(self, src: int, dst: int, length: int, fill: [str, bytes] = b'\x00') -> None:
+        """The "move" method moves the range [src:src + length] to dst (see FileHandler.move).
+
+        :param src: The start of the source range.
+        :type src: int
+        :param dst: The start of the destination range.
+        :type dst: int
+        :param length: The number of bytes.
+        :type length: int
+        :param fill: The pattern for the freed range. default = b'\\x00'
+        :type fill: [str, bytes]
+        :return: None
+        :rtype: None
+        """
+        self.copy(src, dst, length)
+        if dst > src:
+            self.fill(src, min(dst, src + length), fill)
+        elif dst < src:
+            self.fill(max(src, dst + length), src + length, fill)
+
+    def __check(self, stop: int) -> None:
+        if not self.__editable:
+            raise NotEditableError(
+                "You have to add \"editable=True\" to your args or call the \"make_editable\" method, to edit the file.")
+        if stop > self.size:
+            raise ValueError(f"The file ends at {self.size:08X}. Multiple files can not grow.")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, key: [int, slice]) -> bytes:
+        if type(key) == int:
+            key = slice(key, None, None)
+        if key.step:
+            raise NotImplementedError("Stepping is currently not implemented for multiple files")
+        start, stop = self.__range(key.start, key.stop)
+        return b''.join(self.__part(index)[local_start:local_stop]
+                        for index, local_start, local_stop, _ in self.__split(start, stop))
+
+    def __setitem__(self, key, value) -> None:
+        if type(key) == int:
+            key = slice(key, None, None)
+        if key.step:
+            raise NotImplementedError("Stepping is currently not implemented for multiple files")
+        if type(value) == str:
+            value = bytes(value, encoding=self.encoding)
+
+        if key.stop and len(value) != key.stop - key.start:  # Fill Mode
+            self.fill(key.start, key.stop, value)
+            return
+
+        self.__check(key.start + len(value))
+        for index, local_start, local_stop, address in self.__split(key.start, key.start + len(value)):
+            self.__part(index)[local_start:local_stop] = value[address - key.start:address - key.start
+                                                               + local_stop - local_start]
+
+    def __bytes__(self) -> bytes:
+        return self[0:self.size]
+
+    def __str__(self) -> str:
+        return str(self.__bytes__().decode(self.encoding))
+
+    def __del__(self) -> None:
+        self.close()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import re
+from operator import and_
+
+__all__ = ['BytePattern']
+
+CHUNK_SIZE: int = 1 << 20  # Bytes of the file, which are searched at once, if the pattern has no literal byte
+
+_TOKEN = re.compile(r"\s*(?:(?P<byte>[0-9A-Fa-f?]{2})|\[\s*(?P<low>\d+)\s*(?:-\s*(?P<high>\d+)\s*)?\])")
+
+
+class BytePattern(object):
+    def __init__(self, pattern: str) -> None:
+        """A byte pattern with wildcards, nibble masks and gaps, which can be searched with "find()" and
+        "find_all()" like a string.
+
+        The pattern consists of bytes in hex, which may be separated by whitespace:
+
+        - "E8": The byte 0xE8
+        - "??": Any byte
+        - "4?" or "?F": A byte, where only the high or the low nibble is given
+        - "[4]": Any 4 bytes
+        - "[2-6]": Any 2 to 6 bytes (a gap of variable length)
+
+        e.g. "E8 ?? ?? ?? ?? 48 8B" or "48 8? [0-8] C3"
+
+        The longest run of literal bytes is the anchor of the pattern. It is searched with the find method of the
+        handler, which uses the fast substring search on the memory map (and the search index), and the rest of the
+        pattern is only compared around the occurrences of the anchor.
+
+        :param pattern: The pattern.
+        :type pattern: str
+        """
+        self.pattern: str = pattern
+
+        # The pattern is split into segments of fixed length at the gaps of variable length.
+        self.segments: list = []  # (values, masks, literal) tuples
+        self.gaps: list = []  # (minimum, maximum) tuples between the segments
+        values: bytearray = bytearray()
+        masks: bytearray = bytearray()
+        position: int = 0
+        while pattern[position:].strip():
+            token = _TOKEN.match(pattern, position)
+            if token is None:
+                raise ValueError(f"Invalid byte pattern \"{pattern}\" at position {position}.")
+            position = token.end()
+
+            if token.group('byte'):
+                high, low = token.group('byte')
+                values.append(int(high.replace('?', '0') + low.replace('?', '0'), 16))
+                masks.append((0xF0 if high != '?' else 0) | (0x0F if low != '?' else 0))
+                continue
+
+            minimum: int = int(token.group('low'))
+            maximum: int = int(token.group('high') or minimum)
+            if maximum < minimum:
+                raise ValueError(f"Invalid gap \"{token.group().strip()}\" in the byte pattern \"{pattern}\".")
+            if maximum > minimum and not values and not self.segments:
+                raise ValueError(f"The byte pattern \"{pattern}\" can not start with a gap of variable length.")
+            values.extend(bytes(minimum))
+            masks.extend(bytes(minimum))
+            if maximum > minimum:
+                self.segments.append((bytes(values), bytes(masks), all(mask == 0xFF for mask in masks)))
+                self.gaps.append((0, maximum - minimum))
+                values, masks = bytearray(), bytearray()
+        if not values:
+            raise ValueError(f"The byte pattern \"{pattern}\" is empty or ends with a gap of variable length.")
+        self.segments.append((bytes(values), bytes(masks), all(mask == 0xFF for mask in masks)))
+
+        self.min_length: int = sum(len(segment[0]) for segment in self.segments) + sum(gap[0] for gap in self.gaps)
+        self.max_length: int = self.min_length + sum(gap[1] - gap[0] for gap in self.gaps)
+
+        # The anchor and the minimum and maximum distance between the start of a match and the anchor
+        self.anchor: bytes = b''
+        self.anchor_min: int = 0
+        self.anchor_max: int = 0
+        distance_min: int = 0
+        distance_max: int = 0
+        for number, (values, masks, _) in enumerate(self.segments):
+            for literal in re.finditer(b"\xFF+", masks):
+                if literal.end() - literal.start() > len(self.anchor):
+                    self.anchor = values[literal.start():literal.end()]
+                    self.anchor_min = distance_min + literal.start()
+                    self.anchor_max = distance_max + literal.start()
+            if number < len(self.gaps):
+                distance_min += len(values) + self.gaps[number][0]
+                distance_max += len(values) + self.gaps[number][1]
+
+    def __len__(self) -> int:
+        """The maximum length of a match."""
+        return self.max_length
+
+    def __repr__(self) -> str:
+        return f"BytePattern({self.pattern!r})"
+
+    def __matches(self, data: memoryview, position: int = 0, segment: int = 0) -> bool:
+        # Compares the segments from "segment" on with data[position:], trying every length of the gaps
+        values, masks, literal = self.segments[segment]
+        end: int = position + len(values)
+        if end > len(data):
+            return False
+        if literal:
+            if data[position:end] != values:
+                return False
+        elif bytes(map(and_, data[position:end], masks)) != values:
+            return False
+        if segment == len(self.gaps):
+            return True
+        minimum, maximum = self.gaps[segment]
+        return any(self.__matches(data, end + gap, segment + 1) for gap in range(minimum, maximum + 1))
+
+    def find(self, handler, start: int = 0, stop: int = -1) -> [int, None]:
+        """Searches for the first match of the pattern, which lies completely inside of [start:stop]. Use the find
+        method of the handler (or PyHexedit) instead, which calls this for BytePattern values.
+
+        :param handler: The FileHandler of the file.
+        :type handler: FileHandler
+        :param start: The start point of the search. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop point of the search. default = -1 (the end of the file)
+        :type stop: int
+        :return: The position of the match
+        :rtype: [int, None]
+        """
+        stop = len(handler) if stop == -1 else min(stop, len(handler))
+        if not self.anchor:
+            return self.__scan(handler, start, stop)
+
+        checked: int = start  # No match starts before this address
+        found: [int, None] = handler.find(self.anchor, start + self.anchor_min, stop)
+        while found is not None:
+            # The starts, at which the anchor of a match would be at "found"
+            for address in range(max(checked, found - self.anchor_max), found - self.anchor_min + 1):
+                with handler.view(address, min(stop, address + self.max_length)) as data:
+                    if self.__matches(data):
+                        return address
+            checked = found - self.anchor_min + 1
+            found = handler.find(self.anchor, found + 1, stop)
+        return None
+
+    def __scan(self, handler, start: int, stop: int) -> [int, None]:
+        # Without a literal byte, the pattern is compiled into a regular expression of byte classes, which is
+        # searched chunk by chunk
+        expression = self.__expression()
+        for chunk in range(start, stop - self.min_length + 1, CHUNK_SIZE):
+            chunk_stop: int = min(chunk + CHUNK_SIZE, stop - self.min_length + 1)
+            with handler.view(chunk, min(stop, chunk_stop + self.max_length - 1)) as data:
+                found: int = self.__search(expression, data)
+            if found != -1 and chunk + found < chunk_stop:
+                return chunk + found
+        return None
+
+    @staticmethod
+    def __search(expression, data: memoryview) -> int:
+        # The match must not outlive the view
+        match = expression.search(data)
+        return match.start() if match else -1
+
+    def __expression(self):
+        parts: list = []
+        for number, (values, masks, _) in enumerate(self.segments):
+            for value, mask in zip(values, masks):
+                if mask == 0xFF:
+                    parts.append(re.escape(bytes([value])))
+                elif mask == 0:
+                    parts.append(b'.')
+                else:
+                    parts.append(b'[' + b''.join(re.escape(bytes([byte])) for byte in range(256)
+                                                 if byte & mask == value) + b']')
+            if number < len(self.gaps):
+                parts.append(b'.{%d,%d}' % self.gaps[number])
+        return re.compile(b''.join(parts), re.DOTALL)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import re
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from itertools import compress, repeat
+from operator import and_, ge, le
+
+__all__ = ['RecordLayout', 'RecordView']
+
+# Field type: (struct format, array typecode, numpy kind)
+_TYPES: dict = {'u8': ('B', 'B', 'u1'),
+                'i8': ('b', 'b', 'i1'),
+                'u16': ('H', 'H', 'u2'),
+                'i16': ('h', 'h', 'i2'),
+                'u32': ('I', 'I' if array('I').itemsize == 4 else 'L', 'u4'),
+                'i32': ('i', 'i' if array('i').itemsize == 4 else 'l', 'i4'),
+                'u64': ('Q', 'Q', 'u8'),
+                'i64': ('q', 'q', 'i8'),
+                'f16': ('e', None, 'f2'),
+                'f32': ('f', 'f', 'f4'),
+                'f64': ('d', 'd', 'f8')}
+
+_BYTEORDERS: dict = {'little': '<', 'big': '>'}
+
+Field = namedtuple('Field', ['name', 'type', 'offset', 'size', 'format'])
+
+
+class RecordLayout(object):
+    def __init__(self, fields: list, byteorder: str = "little") -> None:
+        """The RecordLayout describes one fixed-size record of a file, like a header or a partition entry.
+
+        The fields are given as list of (name, type) tuples. The types are:
+
+        * u8, i8, u16, i16, u32, i32, u64, i64: Unsigned and signed integers
+        * f16, f32, f64: Floats
+        * <n>s: A fixed string of n bytes, e.g. "16s"
+        * <n>x: n bytes of padding, the name is ignored
+
+        :param fields: The (name, type) tuples of the fields.
+        :type fields: list
+        :param byteorder: The byteorder of all fields: little/big. default = 'little'
+        :type byteorder: str
+        :return: None
+        :rtype: None
+        """
+        if byteorder not in _BYTEORDERS:
+            raise ValueError(f"The byteorder must be \"little\" or \"big\", not \"{byteorder}\".")
+        self.byteorder: str = byteorder
+
+        self.fields: list = []
+        formats: list = []
+        offset: int = 0
+        for name, type_ in fields:
+            fixed = re.fullmatch(r'(\d*)([sx])', type_)
+            if fixed:
+                fmt: str = type_
+                size: int = int(fixed.group(1) or 1)
+            elif type_ in _TYPES:
+                fmt = _TYPES[type_][0]
+                size = struct.calcsize('<' + fmt)
+            else:
+                raise ValueError(f"Unknown field type \"{type_}\" of the field \"{name}\".")
+            if not type_.endswith('x'):
+                self.fields.append(Field(name, type_, offset, size, fmt))
+            formats.append(fmt)
+            offset += size
+
+        self.size: int = offset
+        self.struct: struct.Struct = struct.Struct(_BYTEORDERS[byteorder] + ''.join(formats))
+        self.record = namedtuple('Record', [field.name for field in self.fields])
+        self.__fields: dict = {field.name: field for field in self.fields}
+
+    def field(self, name: str) -> Field:
+        try:
+            return self.__fields[name]
+        except KeyError:
+            raise KeyError(f"The layout has no field \"{name}\".") from None
+
+    def dtype(self):
+        """Returns the layout as structured numpy dtype. numpy must be installed for this.
+
+        :return: The dtype
+        :rtype: numpy.dtype
+        """
+        import numpy  # Optional dependency, only needed here
+
+        order: str = _BYTEORDERS[self.byteorder]
+        return numpy.dtype({'names': [field.name for field in self.fields],
+                            'formats': [f"S{field.size}" if field.type.endswith('s')
+                                        else order + _TYPES[field.type][2] for field in self.fields],
+                            'offsets': [field.offset for field in self.fields],
+                            'itemsize': self.size})
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class RecordView(object):
+    def __init__(self, handler, layout: RecordLayout, offset: int = 0, count: int = None) -> None:
+        """The RecordView maps a range of the file as an array of records.
+
+        It reads directly from the memory map (direct mode) or the cached file (RAM mode) of the handler, without
+        copying the range first. Writes are going through the normal edit path of the handler, so the file must be
+        editable.
+
+        The view keeps no reference to the buffer of the handler between the calls. Only the arrays returned by
+        "numpy()" do. They have to be deleted, before the handler is closed (see FileHandler.view).
+
+        :param handler: The FileHandler of the file.
+        :type handler: FileHandler
+        :param layout: The layout of one record.
+        :type layout: RecordLayout
+        :param offset: The address of the first record. default = 0 (begin of the file)
+        :type offset: int
+        :param count: The number of records. default = None (as many as fit into the file)
+        :type count: int
+        :return: None
+        :rtype: None
+        """
+        self.handler = handler
+        self.layout: RecordLayout = layout
+        self.offset: int = offset
+        available: int = max(0, (len(handler) - offset) // layout.size)
+        self.count: int = available if count is None else count
+        if self.count > available:
+            raise IndexError(f"Only {available} records fit into the file after the address {offset:08X}.")
+
+    def __memory(self) -> memoryview:
+        return self.handler.view(self.offset, self.offset + self.count * self.layout.size)
+
+    def __index(self, index: int) -> int:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("record index out of range")
+        return index
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        with self.__memory() as memory:
+            for values in self.layout.struct.iter_unpack(memory):
+                yield self.layout.record(*values)
+
+    def __getitem__(self, key: [int, slice]):
+        if isinstance(key, slice):
+            size: int = self.layout.size
+            with self.__memory() as memory:
+                return [self.layout.record(*self.layout.struct.unpack_from(memory, index * size))
+                        for index in range(*key.indices(self.count))]
+
+        index: int = self.__index(key)
+        with self.__memory() as memory:
+            return self.layout.record(*self.layout.struct.unpack_from(memory, index * self.layout.size))
+
+    def __setitem__(self, index: int, record) -> None:
+        index = self.__index(index)
+        if isinstance(record, dict):
+            record = self.layout.record(**record)
+        address: int = self.offset + index * self.layout.size
+        self.handler[address:address + self.layout.size] = self.layout.struct.pack(*record)
+
+    def set(self, index: int, name: str, value) -> None:
+        """Writes a single field of a record.
+
+        :param index: The index of the record.
+        :type index: int
+        :param name: The name of the field.
+        :type name: str
+        :param value: The new value.
+        :return: None
+        :rtype: None
+        """
+        field: Field = self.layout.field(name)
+        address: int = self.offset + self.__index(index) * self.layout.size + field.offset
+        self.handler[address:address + field.size] = struct.pack(
+            _BYTEORDERS[self.layout.byteorder] + field.format, value)
+
+    def column(self, name: str) -> [array, list]:
+        """Returns one field of all records. The bytes of the field are gathered with strided slices (one per byte
+        of the field), not record by record.
+
+        :param name: The name of the field.
+        :type name: str
+        :return: The values as array, or as list for strings and f16
+        :rtype: [array, list]
+        """
+        field: Field = self.layout.field(name)
+        size: int = self.layout.size
+        gathered: bytearray = bytearray(self.count * field.size)
+        with self.__memory() as memory:
+            for byte in range(field.size):
+                gathered[byte::field.size] = memory[field.offset + byte::size]
+
+        if field.type.endswith('s'):
+            return [bytes(gathered[i:i + field.size]) for i in range(0, len(gathered), field.size)]
+        typecode: str = _TYPES[field.type][1]
+        if typecode is None:
+            return [value for value, in struct.iter_unpack(_BYTEORDERS[self.layout.byteorder] + 'e', gathered)]
+        values: array = array(typecode, bytes(gathered))
+        if field.size > 1 and self.layout.byteorder != sys.byteorder:
+            values.byteswap()
+        return values
+
+    def where(self, name: str, minimum=None, maximum=None) -> list:
+        """Returns the indexes of all records with minimum <= field <= maximum. The comparison is done with map()
+        and compress(), so no Python code runs per record.
+
+        :param name: The name of the field.
+        :type name: str
+        :param minimum: The minimum value. default = None (no lower limit)
+        :param maximum: The maximum value. default = None (no upper limit)
+        :return: The indexes of the matching records
+        :rtype: list
+        """
+        values: [array, list] = self.column(name)
+        if minimum is None and maximum is None:
+            return list(range(self.count))
+        if minimum is None:
+            selectors = map(ge, repeat(maximum), values)
+        elif maximum is None:
+            selectors = map(le, repeat(minimum), values)
+        else:
+            selectors = map(and_, map(le, repeat(minimum), values), map(ge, repeat(maximum), values))
+        return list(compress(range(self.count), selectors))
+
+    def numpy(self):
+        """Returns the records as structured numpy array. The array shares the memory with the file, so it is not
+        writable. numpy must be installed for this.
+
+        :return: The array
+        :rtype: numpy.ndarray
+        """
+        import numpy  # Optional dependency, only needed here
+
+        records = numpy.frombuffer(self.__memory(), dtype=self.layout.dtype(), count=self.count)
+        records.flags.writeable = False  # The view of a file in RAM mode is writable
+        return records
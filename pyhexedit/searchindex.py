@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+from array import array
+from pathlib import Path
+
+__all__ = ['SearchIndex']
+
+INDEX_VERSION: int = 2
+BLOCK_SIZE: int = 1 << 18  # Bytes of the file per bigram set
+SAMPLES: int = 16  # Number of samples of the file, which are hashed for the key
+SAMPLE_SIZE: int = 1 << 12
+
+_BITMAP_SIZE: int = (1 << 16) // 8
+_ALL_BIGRAMS: range = range(1 << 16)
+_TO_BINARY: bytes = bytes.maketrans(b'\x00\x01', b'01')
+# Maps the bytes of a bitmap to 1, if the bit of a bigram (bigram % 8, the most significant one first) is set
+_BIT_TABLES: tuple = tuple(bytes(byte >> (7 - bit) & 0x01 for byte in range(256)) for bit in range(8))
+
+
+def _bigram_set(data: [bytes, memoryview]) -> set:
+    """Returns the set of all bigrams (two byte sequences) of data as numbers, the first byte is the high byte on
+    every machine, so the index file can be used on machines with another byteorder. All loops run in C."""
+    memory: memoryview = memoryview(data)
+    present: set = set()
+    for phase in (0, 1):  # The bigrams starting at an even and at an odd offset
+        pairs: array = array('H')
+        pairs.frombytes(memory[phase:phase + (len(memory) - phase) // 2 * 2])
+        if sys.byteorder == 'little':
+            pairs.byteswap()
+        present.update(pairs)
+    return present
+
+
+def _bigrams(data: [bytes, memoryview]) -> int:
+    """Returns the set of all bigrams (two byte sequences) of data as a 65536 bit integer. All loops run in C."""
+    present: set = _bigram_set(data)
+    return int(bytes(map(present.__contains__, _ALL_BIGRAMS)).translate(_TO_BINARY), 2)
+
+
+class SearchIndex(object):
+    def __init__(self, file: [Path, str], index_file: [Path, str] = None) -> None:
+        """The SearchIndex is a persistent bigram index of a file, which makes repeated searches in big, read only
+        files (like reference images) faster.
+
+        The file is divided into blocks. For every block the set of bigrams (two byte sequences), which start in it,
+        is stored in the index file next to the file as bitmap. A search only scans the blocks, which contain all
+        bigrams of the searched value. The index is bound to the size, the modification time and a hash over
+        samples of the content of the file. If one of them changes, the index is outdated and not used anymore.
+
+        The index file is memory mapped, when the index is used first, and only the bits of the searched bigrams
+        are read from it. Use "build()" to create or renew it.
+
+        :param file: The indexed file.
+        :type file: [Path, str]
+        :param index_file: The index file. default = None (the file name + ".phi")
+        :type index_file: [Path, str]
+        :return: None
+        :rtype: None
+        """
+        self.file: Path = Path(file)
+        self.index_file: Path = Path(index_file) if index_file else self.file.with_name(self.file.name + ".phi")
+        self.block_size: int = BLOCK_SIZE
+        self.__length: int = 0
+        self.__count: int = 0  # The number of blocks
+        self.__bitmaps = None  # The memory mapped index file or the bitmaps of a built index, which is not saved
+        self.__offset: int = 0  # The position of the first bitmap in __bitmaps
+        self.__last: tuple = (None, [])
+        self.__loaded: bool = False
+        self.__valid: bool = False
+
+    @property
+    def valid(self) -> bool:
+        """Is the index up to date?"""
+        if not self.__loaded:
+            self.__loaded = True
+            self.__valid = self.__load()
+        return self.__valid
+
+    @property
+    def length(self) -> int:
+        """The length of the indexed file, or 0 if the index is not valid."""
+        return self.__length if self.valid else 0
+
+    def __key(self) -> dict:
+        stat: os.stat_result = os.stat(self.file)
+        digest = hashlib.blake2b(digest_size=16)
+        with self.file.open("rb") as fileobj:  # Hashing samples is cheap, even for files of many GB
+            for sample in range(SAMPLES):
+                fileobj.seek(max(0, stat.st_size - SAMPLE_SIZE) * sample // (SAMPLES - 1))
+                digest.update(fileobj.read(SAMPLE_SIZE))
+        return {'version': INDEX_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                'hash': digest.hexdigest()}
+
+    def __load(self) -> bool:
+        try:
+            with self.index_file.open("rb") as index:
+                header: dict = json.loads(index.readline())
+                if header.get('key') != self.__key():
+                    logging.info(f"The search index \"{self.index_file}\" is outdated. Searches scan the file.")
+                    return False
+                offset: int = index.tell()
+                if os.fstat(index.fileno()).st_size - offset != header['blocks'] * _BITMAP_SIZE:
+                    logging.warning(f"The search index \"{self.index_file}\" is damaged. Searches scan the file.")
+                    return False
+                bitmaps = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ) if header['blocks'] else b''
+        except (IOError, ValueError, KeyError):
+            return False
+
+        self.close()
+        self.block_size = header['block_size']
+        self.__length = header['length']
+        self.__count = header['blocks']
+        self.__bitmaps = bitmaps
+        self.__offset = offset
+        return True
+
+    def close(self) -> None:
+        """Closes the memory map of the index file. The index is loaded again, when it is used next time.
+
+        :return: None
+        :rtype: None
+        """
+        if isinstance(self.__bitmaps, mmap.mmap):
+            self.__bitmaps.close()
+        self.__bitmaps = None
+        self.__last = (None, [])
+        self.__loaded = False
+        self.__valid = False
+
+    def build(self, handler, block_size: int = BLOCK_SIZE) -> None:
+        """Builds the index from the content of the handler and saves it. The content is read block by block.
+
+        :param handler: The FileHandler of the file.
+        :type handler: FileHandler
+        :param block_size: The bytes of the file per bigram set. Smaller blocks need a bigger index, but less
+          bytes are scanned per search. default = 256 KiB
+        :type block_size: int
+        :return: None
+        :rtype: None
+        """
+        logging.info(f"Building the search index of \"{self.file}\"...")
+        self.close()
+        length: int = len(handler)
+        bitmaps: bytearray = bytearray()
+        for start in range(0, length, block_size):
+            # One byte more, so the bigram, which starts at the last byte of the block, belongs to it
+            with handler.view(start, min(length, start + block_size + 1)) as memory:
+                bitmaps += _bigrams(memory).to_bytes(_BITMAP_SIZE, 'big')
+
+        try:
+            with self.index_file.open("wb") as index:
+                index.write(json.dumps({'key': self.__key(), 'block_size': block_size, 'length': length,
+                                        'blocks': len(bitmaps) // _BITMAP_SIZE}).encode() + b'\n')
+                index.write(bitmaps)
+        except IOError as e:
+            logging.warning(f"The search index could not be saved: {e}")
+        if self.valid:  # Maps the saved index
+            return
+
+        # Not saved: The index is kept in memory
+        self.block_size = block_size
+        self.__length = length
+        self.__count = len(bitmaps) // _BITMAP_SIZE
+        self.__bitmaps = bitmaps
+        self.__offset = 0
+        self.__loaded = True
+        self.__valid = True
+
+    def candidates(self, value: bytes, start: int = 0, stop: int = -1) -> [list, None]:
+        """Returns the ranges of the file, which may contain value, as (start, stop) tuples inside of [start:stop].
+        Every occurrence of value lies completely inside of one of the ranges.
+
+        :param value: The searched value.
+        :type value: bytes
+        :param start: The start of the search. default = 0 (begin of the file)
+        :type start: int
+        :param stop: The stop of the search. default = -1 (the end of the file)
+        :type stop: int
+        :return: The ranges, or None if the index can not be used for value
+        :rtype: [list, None]
+        """
+        if len(value) < 2 or not self.valid:
+            return None
+        stop = self.__length if stop == -1 else min(stop, self.__length)
+
+        if self.__last[0] != value:  # find_all() asks for the same value again and again
+            self.__last = (value, self.__blocks(value))
+
+        ranges: list = []
+        for first, stop_block in self.__last[1]:
+            range_start: int = max(start, first * self.block_size)
+            range_stop: int = min(stop, stop_block * self.block_size + len(value) - 1)
+            if range_stop - range_start >= len(value):
+                ranges.append((range_start, range_stop))
+        return ranges
+
+    def __blocks(self, value: bytes) -> list:
+        # Returns the candidate blocks, merged to (first, stop) tuples. For every bigram of value, the byte with its
+        # bit is read from every bitmap with one strided slice. A block is a candidate, if all bigrams are present
+        # in it or in the "span" following blocks, in which the bigrams of a match starting in it may start.
+        if not self.__count:
+            return []
+        span: int = (self.block_size + len(value) - 3) // self.block_size
+        count: int = self.__count
+        bigrams: set = _bigram_set(value)
+
+        found: int = -1  # All blocks, one byte per block
+        for bigram in bigrams:
+            position: int = self.__offset + (bigram >> 3)
+            column: bytes = self.__bitmaps[position:position + count * _BITMAP_SIZE:_BITMAP_SIZE]
+            present: int = int.from_bytes(column.translate(_BIT_TABLES[bigram & 0x07]), 'big')
+            spread: int = present
+            for following in range(1, span + 1):
+                spread |= present << (8 * following)  # The bigram is present in one of the following blocks
+            found &= spread
+        selected: bytes = (found & ((1 << (8 * count)) - 1)).to_bytes(count, 'big')
+        return [[match.start(), match.end()] for match in re.finditer(b"[^\x00]+", selected)]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import heapq
+import re
+from collections import namedtuple
+
+__all__ = ['STRING_ENCODINGS', 'String', 'extract_strings']
+
+CHUNK_SIZE: int = 1 << 20  # Bytes of the file, which are searched at once
+TAIL_SIZE: int = 4096  # Bytes at the end of a chunk, which are searched for a position to cut the chunk
+
+String = namedtuple('String', ['address', 'encoding', 'text'])
+
+_PRINTABLE: bytes = rb"[\t\x20-\x7e]"
+_UTF8: bytes = (rb"(?:[\t\x20-\x7e]|\xc2[\xa0-\xbf]|[\xc3-\xdf][\x80-\xbf]|\xe0[\xa0-\xbf][\x80-\xbf]"
+                rb"|[\xe1-\xec\xee\xef][\x80-\xbf]{2}|\xed[\x80-\x9f][\x80-\xbf]|\xf0[\x90-\xbf][\x80-\xbf]{2}"
+                rb"|[\xf1-\xf3][\x80-\xbf]{3}|\xf4[\x80-\x8f][\x80-\xbf]{2})")
+
+# Encoding: (codec, character, breaker). A string never contains both bytes of a breaker, so a chunk can be cut
+# between them without cutting a string.
+_ENCODINGS: dict = {'ascii': ('ascii', _PRINTABLE, rb"[^\t\x20-\x7e]"),
+                    'utf8': ('utf-8', _UTF8, rb"[\x00-\x08\x0a-\x1f\x7f\xc0\xc1\xf5-\xff]"),
+                    'utf16le': ('utf-16-le', rb"(?:" + _PRINTABLE + rb"\x00)", rb"\x00\x00|[^\x00][^\x00]"),
+                    'utf16be': ('utf-16-be', rb"(?:\x00" + _PRINTABLE + rb")", rb"\x00\x00|[^\x00][^\x00]")}
+
+STRING_ENCODINGS: tuple = tuple(_ENCODINGS)
+
+
+def _cut(breaker, data: memoryview) -> int:
+    # Returns the position after the first byte of the last breaker in data, or 0 if there is none
+    tail: int = TAIL_SIZE
+    while True:
+        position: int = max(0, len(data) - tail)
+        cut: int = max((match.start() + 1 for match in breaker.finditer(data, position)), default=0)
+        if cut or position == 0:
+            return cut
+        tail *= 4
+
+
+def _strings(handler, encoding: str, min_length: int, start: int, stop: int, chunk_size: int):
+    codec, character, breaker = _ENCODINGS[encoding]
+    expression = re.compile(character + b"{%d,}" % min_length)
+    breaker = re.compile(breaker)
+
+    position: int = start
+    size: int = chunk_size
+    while position < stop:
+        view_stop: int = min(stop, position + size)
+        with handler.view(position, view_stop) as data:
+            cut: int = len(data) if view_stop == stop else _cut(breaker, data)
+            if cut == 0:  # One string fills the whole chunk
+                size *= 2
+                continue
+            found: list = [(position + match.start(), bytes(match.group()))
+                           for match in expression.finditer(data, 0, cut)]
+        for address, value in found:
+            yield String(address, encoding, value.decode(codec))
+        position += cut
+        size = chunk_size
+
+
+def extract_strings(handler, min_length: int = 4, encodings: [list, tuple] = ('ascii',), start: int = 0,
+                    stop: int = -1, chunk_size: int = CHUNK_SIZE):
+    """Extracts the strings of the range [start:stop], like the "strings" utility does, and generates them as
+    String(address, encoding, text) tuples in the order of their addresses. A string is a run of at least
+    "min_length" printable characters (the tab and the ASCII characters from the space to the "~").
+
+    The encodings are:
+
+    - "ascii": One byte per character
+    - "utf8": Like ascii, but the (printable) characters above U+009F are also part of strings
+    - "utf16le", "utf16be": Two bytes per character (ASCII characters only)
+
+    The range is searched chunk by chunk with regular expressions on views of the file. A chunk is cut between
+    two bytes, which can not be part of the same string, so strings are never split.
+
+    :param handler: The FileHandler of the file.
+    :type handler: FileHandler
+    :param min_length: The minimum number of characters of a string. default = 4
+    :type min_length: int
+    :param encodings: The encodings of the strings. default = ('ascii',)
+    :type encodings: [list, tuple]
+    :param start: The start of the range. default = 0 (begin of the file)
+    :type start: int
+    :param stop: The stop of the range. default = -1 (the end of the file)
+    :type stop: int
+    :param chunk_size: The bytes searched at once. default = 1 MiB
+    :type chunk_size: int
+    :return: The strings
+    :rtype: Iterator[String]
+    """
+    for encoding in encodings:
+        if encoding not in _ENCODINGS:
+            raise ValueError(f"Unknown encoding \"{encoding}\". Use one of: {', '.join(STRING_ENCODINGS)}")
+    if min_length < 1:
+        raise ValueError("The minimum length must be at least 1.")
+    stop = len(handler) if stop == -1 else min(stop, len(handler))
+
+    yield from heapq.merge(*(_strings(handler, encoding, min_length, start, stop, chunk_size)
+                             for encoding in encodings))
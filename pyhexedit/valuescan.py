@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import struct
+import sys
+from array import array
+from itertools import compress, repeat
+from operator import and_, ge, le
+
+from pyhexedit.records import _BYTEORDERS, _TYPES
+
+__all__ = ['SCAN_TYPES', 'scan_values']
+
+SCAN_TYPES: tuple = tuple(_TYPES)
+CHUNK_SIZE: int = 1 << 20  # Bytes of the file, which are compared at once
+
+
+def _numpy():
+    try:
+        import numpy  # Optional dependency, the comparisons are made with array and map() without it
+    except ImportError:
+        return None
+    return numpy
+
+
+def _matches(memory: memoryview, type_: str, byteorder: str, phase: int, minimum, maximum) -> list:
+    # Returns the indexes of the matching values of the type, which start at phase, phase + size, ... of memory
+    size: int = struct.calcsize('<' + _TYPES[type_][0])
+    count: int = (len(memory) - phase) // size
+    if count <= 0:
+        return []
+
+    numpy = _numpy()
+    if numpy is not None:
+        values = numpy.frombuffer(memory, numpy.dtype(_BYTEORDERS[byteorder] + _TYPES[type_][2]), count, phase)
+        selected = numpy.ones(count, dtype=bool)
+        if minimum is not None:
+            selected &= values >= minimum
+        if maximum is not None:
+            selected &= values <= maximum
+        return numpy.flatnonzero(selected).tolist()
+
+    typecode: str = _TYPES[type_][1]
+    if typecode is None:  # f16
+        values = [value for value, in struct.iter_unpack(_BYTEORDERS[byteorder] + 'e',
+                                                         memory[phase:phase + count * size])]
+    else:
+        values = array(typecode)
+        values.frombytes(memory[phase:phase + count * size])
+        if size > 1 and byteorder != sys.byteorder:
+            values.byteswap()
+    if minimum is None and maximum is None:
+        return list(range(count))
+    if minimum is None:
+        selectors = map(ge, repeat(maximum), values)
+    elif maximum is None:
+        selectors = map(le, repeat(minimum), values)
+    else:
+        selectors = map(and_, map(le, repeat(minimum), values), map(ge, repeat(maximum), values))
+    return list(compress(range(count), selectors))
+
+
+def scan_values(handler, type_: str, value=None, minimum=None, maximum=None, tolerance=None,
+                byteorder: str = "little", alignment: int = 1, start: int = 0, stop: int = -1,
+                chunk_size: int = CHUNK_SIZE):
+    """Scans the range [start:stop] for numbers of a type at every (aligned) address and generates the addresses
+    of the matching numbers in ascending order.
+
+    The range is read chunk by chunk. Every chunk is interpreted as typed array once per byte offset inside of the
+    type (e.g. 4 times for u32) and compared as a whole: with numpy, if it is installed, otherwise with array and
+    map(). An exact integer is searched as its byte representation with the find method of the handler.
+
+    The types are the ones of RecordLayout: u8, i8, u16, i16, u32, i32, u64, i64, f16, f32, f64
+
+    :param handler: The FileHandler of the file.
+    :type handler: FileHandler
+    :param type_: The type of the numbers.
+    :type type_: str
+    :param value: The exact value. With tolerance, the range [value - tolerance:value + tolerance]. default = None
+    :param minimum: The minimum value (inclusive). default = None (no lower limit)
+    :param maximum: The maximum value (inclusive). default = None (no upper limit)
+    :param tolerance: The tolerance of value. default = None (exact)
+    :param byteorder: The byteorder: little/big. default = 'little'
+    :type byteorder: str
+    :param alignment: Only addresses, which are a multiple of this, are scanned. default = 1 (every address)
+    :type alignment: int
+    :param start: The start of the range. default = 0 (begin of the file)
+    :type start: int
+    :param stop: The stop of the range. default = -1 (the end of the file)
+    :type stop: int
+    :param chunk_size: The bytes compared at once. default = 1 MiB
+    :type chunk_size: int
+    :return: The addresses
+    :rtype: Iterator[int]
+    """
+    if type_ not in _TYPES:
+        raise ValueError(f"Unknown type \"{type_}\". Use one of: {', '.join(SCAN_TYPES)}")
+    if byteorder not in _BYTEORDERS:
+        raise ValueError(f"The byteorder must be \"little\" or \"big\", not \"{byteorder}\".")
+    if alignment < 1:
+        raise ValueError("The alignment must be at least 1.")
+    if value is not None:
+        if minimum is not None or maximum is not None:
+            raise ValueError("Give either a value or a minimum/maximum, not both.")
+        tolerance = tolerance or 0
+        minimum, maximum = value - tolerance, value + tolerance
+
+    fmt: str = _BYTEORDERS[byteorder] + _TYPES[type_][0]
+    size: int = struct.calcsize(fmt)
+    stop = len(handler) if stop == -1 else min(stop, len(handler))
+
+    if value is not None and not tolerance and not type_.startswith('f'):
+        try:
+            pattern: bytes = struct.pack(fmt, value)
+        except struct.error:
+            return  # The value does not fit into the type
+        address = handler.find(pattern, start, stop)
+        while address is not None:
+            if address % alignment == 0:
+                yield address
+            address = handler.find(pattern, address + 1, stop)
+        return
+
+    chunk_size = max(chunk_size, size)
+    for chunk in range(start, stop - size + 1, chunk_size):
+        chunk_stop: int = min(chunk + chunk_size, stop - size + 1)  # The last address of the chunk + 1
+        with handler.view(chunk, chunk_stop + size - 1) as memory:
+            addresses: list = []
+            for phase in range(size):
+                if alignment % size == 0 and (chunk + phase) % size:
+                    continue  # No aligned address in this phase
+                addresses.extend(chunk + phase + index * size
+                                 for index in _matches(memory, type_, byteorder, phase, minimum, maximum))
+        addresses.sort()
+        yield from (address for address in addresses if address < chunk_stop and address % alignment == 0)
@@ -0,0 +1,484 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import logging
+import queue
+import string
+import threading
+from collections import OrderedDict
+
+__all__ = ['Viewer']
+
+PAGE_SIZE: int = 1 << 16  # Bytes read from the file at once
+CACHED_PAGES: int = 64
+PREFETCH_PAGES: int = 2  # Pages before and after the screen, which are read in the background
+INCREMENTAL_LIMIT: int = 1 << 26  # Bytes searched per keystroke, while the search value is typed
+SEARCH_CHUNK: int = 1 << 24  # Bytes searched at once. Between the chunks, the viewer checks for Esc.
+
+_HELP: str = "q:quit  :/g:jump  /:search  n:next  i:edit  tab:hex/ascii  esc:end edit  w:save"
+_PRINTABLE: set = set(string.printable.encode()) - set(b'\t\n\r\x0b\x0c')
+
+
+class Viewer(object):
+    def __init__(self, hexedit) -> None:
+        """The Viewer is an interactive terminal viewer and editor for a PyHexedit.
+
+        Only the visible rows are read from the file, so scrolling does not depend on the size of the file. The
+        file is read in pages, which are cached. A background thread reads the pages before and after the screen,
+        before they are needed. Searches use the find method of the handler, edits are made through __setitem__.
+
+        Keys:
+
+        * Arrows, PgUp, PgDn, Home, End (or h, j, k, l, b, space, g, G): Move the cursor
+        * ":": Jump to a hexadecimal address
+        * "/": Search. The file is searched while typing (only the next 64 MiB). Enter searches the whole file,
+          Esc cancels that search. Values starting with "0x" are hexadecimal bytes, e.g. "0x7f454c46".
+        * "n": Next occurrence
+        * "i": Edit mode (hex digits in the hex column, characters in the text column), Tab switches the column,
+          Esc ends the edit mode. In direct mode, the file is either copied to a tempfile first (which has to be
+          confirmed) or edited in place.
+        * "w": Save, "q": Quit
+
+        :param hexedit: The PyHexedit of the file.
+        :type hexedit: PyHexedit
+        :return: None
+        :rtype: None
+        """
+        self.hexedit = hexedit
+        self.bytes_per_line: int = hexedit.handler.bytes_per_line
+        self.size: int = len(hexedit)
+        self.top: int = 0  # The address of the first row
+        self.cursor: int = 0
+        self.match: tuple = None  # (address, length) of the last occurrence
+        self.query: str = ""
+        self.message: str = _HELP
+        self.editing: bool = False
+        self.edit_text: bool = False  # Edit in the text column instead of the hex column
+        self.__nibble: bool = False  # The high nibble of the byte under the cursor was typed
+        self.__quit: bool = False
+
+        self.__pages: OrderedDict = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()  # The handler is not thread safe
+        self.__wanted: queue.Queue = queue.Queue()
+        self.__queued: set = set()  # Pages in the queue, they are queued only once
+        self.__running: bool = False
+
+    # Reading
+
+    def __page(self, number: int) -> bytes:
+        with self.__lock:
+            data: bytes = self.__pages.get(number)
+            if data is None:
+                data = self.hexedit[number * PAGE_SIZE:min(self.size, (number + 1) * PAGE_SIZE)]
+                self.__pages[number] = data
+                if len(self.__pages) > CACHED_PAGES:
+                    self.__pages.popitem(last=False)
+            else:
+                self.__pages.move_to_end(number)
+            return data
+
+    def read(self, start: int, stop: int) -> bytes:
+        """Returns the range [start:stop] from the cached pages.
+
+        :param start: The start of the range.
+        :type start: int
+        :param stop: The stop of the range.
+        :type stop: int
+        :return: The range
+        :rtype: bytes
+        """
+        stop = min(stop, self.size)
+        if stop <= start:
+            return b''
+        return b''.join(self.__page(page)[max(0, start - page * PAGE_SIZE):stop - page * PAGE_SIZE]
+                        for page in range(start // PAGE_SIZE, (stop - 1) // PAGE_SIZE + 1))
+
+    def __prefetch(self, rows: int) -> None:
+        first: int = max(0, self.top // PAGE_SIZE - PREFETCH_PAGES)
+        last: int = min((self.size - 1) // PAGE_SIZE, (self.top + rows * self.bytes_per_line) // PAGE_SIZE
+                        + PREFETCH_PAGES)
+        for page in range(first, last + 1):
+            if page not in self.__pages and page not in self.__queued:
+                self.__queued.add(page)
+                self.__wanted.put(page)
+
+    def __prefetcher(self) -> None:
+        while True:
+            page: int = self.__wanted.get()
+            if not self.__running:
+                return
+            self.__queued.discard(page)
+            try:
+                self.__page(page)
+            except Exception as e:  # The viewer must not die in the background
+                logging.debug(f"Prefetching page {page} failed: {e}")
+
+    def __forget(self, start: int, stop: int) -> None:
+        with self.__lock:
+            for page in range(start // PAGE_SIZE, (max(start, stop - 1)) // PAGE_SIZE + 1):
+                self.__pages.pop(page, None)
+
+    # Moving and searching
+
+    def goto(self, address: int, rows: int) -> None:
+        """Moves the cursor to address and scrolls, so it is visible.
+
+        :param address: The address.
+        :type address: int
+        :param rows: The number of visible rows.
+        :type rows: int
+        :return: None
+        :rtype: None
+        """
+        self.cursor = max(0, min(address, self.size - 1))
+        self.__nibble = False
+        line: int = self.cursor - self.cursor % self.bytes_per_line
+        if line < self.top:
+            self.top = line
+        elif line >= self.top + rows * self.bytes_per_line:
+            self.top = line - (rows - 1) * self.bytes_per_line
+
+    def __value(self, text: str) -> bytes:
+        if text.startswith("0x"):
+            digits: str = text[2:]
+            return bytes.fromhex(digits[:len(digits) // 2 * 2])  # Ignore a half typed byte
+        return text.encode(self.hexedit.handler.encoding)
+
+    def find(self, text: str, start: int, limit: int = None, cancelled=None) -> [int, None]:
+        """Searches the next occurrence of text from start on. Without a limit, the search continues at the begin
+        of the file, if nothing was found up to the end.
+
+        The file is searched in chunks of SEARCH_CHUNK bytes. The lock of the handler is released between them, so
+        the prefetcher is not blocked by long searches.
+
+        :param text: The searched text, or hexadecimal bytes starting with "0x".
+        :type text: str
+        :param start: The first address.
+        :type start: int
+        :param limit: The maximum number of searched bytes. default = None (the whole file)
+        :type limit: int
+        :param cancelled: Called with the searched fraction between two chunks. If it returns True, the search is
+          cancelled and None is returned. default = None
+        :type cancelled: Callable[[float], bool]
+        :return: The address or None
+        :rtype: [int, None]
+        """
+        value: bytes = self.__value(text)
+        if not value:
+            return None
+        if limit is not None:
+            ranges: list = [(start, min(self.size, start + limit))]
+        elif start > 0:
+            ranges = [(start, self.size), (0, min(self.size, start))]
+        else:
+            ranges = [(0, self.size)]
+        total: int = max(1, sum(stop - begin for begin, stop in ranges))
+        searched: int = 0
+        for begin, stop in ranges:
+            for chunk in range(begin, stop, SEARCH_CHUNK):
+                if searched and cancelled is not None and cancelled(searched / total):
+                    return None
+                # Matches starting in the chunk may end behind it
+                with self.__lock:
+                    hit: [int, None] = self.hexedit.find(value, chunk, min(self.size, min(chunk + SEARCH_CHUNK, stop)
+                                                                           + len(value) - 1))
+                if hit is not None:
+                    self.match = (hit, len(value))
+                    return hit
+                searched += min(SEARCH_CHUNK, stop - chunk)
+        return None
+
+    # Editing
+
+    def __write(self, value: bytes) -> None:
+        if self.cursor + len(value) > self.size:
+            self.message = "Writing past the end of the file is not possible."
+            return
+        with self.__lock:
+            self.hexedit[self.cursor] = value
+        self.__forget(self.cursor, self.cursor + len(value))
+
+    def __edit(self, key: int) -> None:
+        if self.size == 0:
+            return
+        if self.edit_text:
+            if key in _PRINTABLE:
+                self.__write(bytes([key]))
+                self.cursor = min(self.size - 1, self.cursor + 1)
+            return
+        if chr(key) in string.hexdigits:
+            old: int = self.read(self.cursor, self.cursor + 1)[0]
+            digit: int = int(chr(key), 16)
+            if self.__nibble:
+                self.__write(bytes([old & 0xF0 | digit]))
+                self.cursor = min(self.size - 1, self.cursor + 1)
+                self.__nibble = False
+            else:
+                self.__write(bytes([digit << 4 | old & 0x0F]))
+                self.__nibble = True
+
+    def __make_editable(self, screen, curses) -> bool:
+        # In direct mode the file is copied to a tempfile, which blocks the viewer. So the copy has to be confirmed,
+        # or the file is edited in place instead.
+        size: int = self.hexedit.handler.edit_copy_size()
+        infile_edit: [bool, None] = None
+        if size:
+            key: int = self.__ask(screen, curses, f"Editing copies {size:,} bytes ({size / (1 << 20):,.1f} MiB) to a "
+                                                  "tempfile.  c:copy  p:edit in place (no undo)  esc:cancel")
+            if key not in (ord('c'), ord('p')):
+                return False
+            infile_edit = key == ord('p')
+            if not infile_edit:
+                self.__ask(screen, curses, f"Copying {size:,} bytes to the tempfile...", wait=False)
+        try:
+            with self.__lock:
+                self.hexedit.handler.make_editable(infile_edit)
+                self.__pages.clear()
+        except Exception as e:
+            self.message = f"The file can not be edited: {e}"
+            return False
+        return True
+
+    # Drawing
+
+    def __put(self, screen, y: int, x: int, text: str, attribute: int = 0) -> None:
+        height, width = screen.getmaxyx()
+        if x >= width or y >= height:
+            return
+        try:
+            screen.addnstr(y, x, text, width - x, attribute)
+        except Exception:  # curses.error, when the last cell of the screen is written
+            pass
+
+    def __draw(self, screen, curses) -> None:
+        height, width = screen.getmaxyx()
+        rows: int = max(1, height - 1)
+        digits: int = max(8, len(f"{max(0, self.size - 1):X}"))
+        text_column: int = digits + 4 + 3 * self.bytes_per_line + 3
+        data: bytes = self.read(self.top, self.top + rows * self.bytes_per_line)
+
+        screen.erase()
+        for row in range(rows):
+            address: int = self.top + row * self.bytes_per_line
+            if address >= self.size:
+                break
+            self.__put(screen, row, 0, f"{address:0{digits}X}  |")
+            self.__put(screen, row, text_column - 3, "|")
+            line: bytes = data[row * self.bytes_per_line:(row + 1) * self.bytes_per_line]
+            for column, byte in enumerate(line):
+                hex_attribute, text_attribute = self.__attributes(address + column, curses)
+                self.__put(screen, row, digits + 4 + 3 * column, f"{byte:02X}", hex_attribute)
+                self.__put(screen, row, text_column + column, chr(byte) if byte in _PRINTABLE else '.',
+                           text_attribute)
+
+        mode: str = ("EDIT TEXT" if self.edit_text else "EDIT HEX") if self.editing else "VIEW"
+        status: str = f" {self.cursor:0{digits}X}/{self.size:0{digits}X}  {mode}  {self.message}"
+        self.__put(screen, height - 1, 0, status.ljust(width), curses.A_REVERSE)
+        screen.refresh()
+
+    def __attributes(self, address: int, curses) -> tuple:
+        attribute: int = 0
+        if self.match is not None and self.match[0] <= address < self.match[0] + self.match[1]:
+            attribute = curses.A_BOLD | curses.A_UNDERLINE
+        if address != self.cursor:
+            return attribute, attribute
+        if not self.editing:
+            return attribute | curses.A_REVERSE, attribute | curses.A_REVERSE
+        active, other = attribute | curses.A_REVERSE, attribute | curses.A_UNDERLINE
+        return (other, active) if self.edit_text else (active, other)
+
+    def __ask(self, screen, curses, label: str, wait: bool = True) -> [int, None]:
+        # Shows the label in the status line and returns the next key
+        height, width = screen.getmaxyx()
+        self.__put(screen, height - 1, 0, f" {label}".ljust(width), curses.A_REVERSE)
+        screen.refresh()
+        return screen.getch() if wait else None
+
+    def __prompt(self, screen, curses, label: str, on_change=None) -> [str, None]:
+        text: str = ""
+        while True:
+            height, width = screen.getmaxyx()
+            self.__put(screen, height - 1, 0, f" {label}{text}".ljust(width), curses.A_REVERSE)
+            screen.refresh()
+            key: int = screen.getch()
+            if key == 27:  # Esc
+                return None
+            if key in (curses.KEY_ENTER, 10, 13):
+                return text
+            if key in (curses.KEY_BACKSPACE, 127, 8):
+                text = text[:-1]
+            elif 32 <= key < 127:
+                text += chr(key)
+            else:
+                continue
+            if on_change is not None:
+                on_change(text)
+                self.__draw(screen, curses)
+
+    # Keys
+
+    def __handle(self, screen, curses, key: int) -> bool:
+        rows: int = max(1, screen.getmaxyx()[0] - 1)
+        moves: dict = {curses.KEY_LEFT: -1,
+                       curses.KEY_RIGHT: 1,
+                       curses.KEY_UP: -self.bytes_per_line,
+                       curses.KEY_DOWN: self.bytes_per_line,
+                       curses.KEY_PPAGE: -rows * self.bytes_per_line,
+                       curses.KEY_NPAGE: rows * self.bytes_per_line}
+        if not self.editing:
+            moves.update({ord('h'): -1, ord('l'): 1, ord('k'): -self.bytes_per_line, ord('j'): self.bytes_per_line,
+                          ord('b'): -rows * self.bytes_per_line, ord(' '): rows * self.bytes_per_line})
+
+        if key in moves:
+            self.goto(self.cursor + moves[key], rows)
+        elif key == curses.KEY_HOME or (not self.editing and key == ord('g')):
+            self.goto(0, rows)
+        elif key == curses.KEY_END or (not self.editing and key == ord('G')):
+            self.goto(self.size - 1, rows)
+        elif key == curses.KEY_RESIZE:
+            self.goto(self.cursor, rows)
+        elif self.editing:
+            if key == 27:  # Esc
+                self.editing, self.__nibble = False, False
+            elif key == 9:  # Tab
+                self.edit_text, self.__nibble = not self.edit_text, False
+            else:
+                self.__edit(key)
+        elif key == ord('q'):
+            if self.hexedit.handler.unsaved_changes and not self.__quit:
+                self.message = "There are unsaved changes. Press q again to quit without saving, w to save."
+                self.__quit = True
+                return True
+            return False
+        elif key == ord(':'):
+            text: [str, None] = self.__prompt(screen, curses, "Address (hex): ")
+            try:
+                if text:
+                    self.goto(int(text, 16), rows)
+            except ValueError:
+                self.message = f"\"{text}\" is not a hexadecimal address."
+        elif key == ord('/'):
+            self.__search(screen, curses, rows)
+        elif key == ord('n'):
+            if self.query:
+                self.__search_all(screen, curses, self.query, self.cursor + 1, rows)
+        elif key == ord('i'):
+            if not self.hexedit.handler.unsaved_changes and not self.__make_editable(screen, curses):
+                return True
+            self.editing = True
+            self.message = _HELP
+        elif key == ord('w'):
+            try:
+                with self.__lock:
+                    self.hexedit.save()
+                self.message = "Saved."
+            except Exception as e:
+                self.message = f"Saving failed: {e}"
+        self.__quit = False
+        return True
+
+    def __search(self, screen, curses, rows: int) -> None:
+        origin: int = self.cursor
+
+        def incremental(text: str) -> None:
+            try:
+                hit: [int, None] = self.find(text, origin, INCREMENTAL_LIMIT)
+            except ValueError:
+                return  # Not a valid hex value (yet)
+            if hit is not None:
+                self.goto(hit, rows)
+                self.message = f"Found at {hit:08X}"
+            else:
+                self.match = None
+                self.message = f"Not found in the next {INCREMENTAL_LIMIT >> 20} MiB, press Enter to search on."
+
+        text: [str, None] = self.__prompt(screen, curses, "Search: ", incremental)
+        if text is None:
+            self.goto(origin, rows)
+            self.message = _HELP
+            return
+        self.query = text
+        try:
+            self.__search_all(screen, curses, text, origin, rows)
+        except ValueError:
+            self.message = f"\"{text}\" is not a valid hex value."
+
+    def __search_all(self, screen, curses, text: str, start: int, rows: int) -> None:
+        # Searches the whole file. Between the chunks, the progress is shown and Esc cancels the search.
+        cancelled: list = []
+
+        def check(fraction: float) -> bool:
+            self.__ask(screen, curses, f"Searching \"{text}\"... {fraction:.0%}  esc:cancel", wait=False)
+            screen.nodelay(True)
+            try:
+                if screen.getch() == 27:  # Esc
+                    cancelled.append(True)
+            finally:
+                screen.nodelay(False)
+            return bool(cancelled)
+
+        hit: [int, None] = self.find(text, start, cancelled=check)
+        if cancelled:
+            self.message = f"Search for \"{text}\" cancelled."
+            return
+        self.__found(hit, rows)
+
+    def __found(self, hit: [int, None], rows: int) -> None:
+        if hit is None:
+            self.message = f"\"{self.query}\" not found."
+            return
+        self.goto(hit, rows)
+        self.message = f"Found at {hit:08X}"
+
+    # Main loop
+
+    def run(self) -> None:
+        """Runs the viewer until it is quit.
+
+        :return: None
+        :rtype: None
+        """
+        import curses  # Not available on every platform, only needed here
+
+        curses.wrapper(self.__main, curses)
+
+    def __main(self, screen, curses) -> None:
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        if hasattr(curses, 'set_escdelay'):
+            curses.set_escdelay(25)
+        screen.keypad(True)
+
+        self.__running = True
+        prefetcher: threading.Thread = threading.Thread(target=self.__prefetcher, daemon=True)
+        prefetcher.start()
+        try:
+            while True:
+                self.__draw(screen, curses)
+                self.__prefetch(max(1, screen.getmaxyx()[0] - 1))
+                if not self.__handle(screen, curses, screen.getch()):
+                    break
+        finally:
+            self.__running = False
+            self.__wanted.put(None)  # Wakes the prefetcher up
+            prefetcher.join()
@@ -73,4 +73,8 @@ setup(
     keywords='hex hexeditor util utilitie cmd terminal package library lib',
     packages=find_packages(exclude=['contrib', 'docs', 'tests*']),
     python_requires='>=3.6',
+    extras_require={
+        'zstd': ['zstandard'],
+        'numpy': ['numpy'],
+    },
 )
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import gzip
+import lzma
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from pyhexedit.compressed import CompressedFile
+from pyhexedit.filehandler import FileHandler
+
+
+def _data(size: int, seed: int = 0) -> bytes:
+    # Compressible, but not trivial data
+    generator: random.Random = random.Random(seed)
+    words: list = [bytes(generator.getrandbits(8) for _ in range(generator.randrange(1, 12))) for _ in range(200)]
+    data: bytearray = bytearray()
+    while len(data) < size:
+        data += generator.choice(words)
+    return bytes(data[:size])
+
+
+def _check_reads(compressed: CompressedFile, data: bytes, seed: int = 1) -> None:
+    generator: random.Random = random.Random(seed)
+    assert len(compressed) == len(data)
+    for _ in range(40):
+        offset: int = generator.randrange(len(data))
+        length: int = generator.randrange(1, 3 << 20)
+        assert compressed.read(offset, length) == data[offset:offset + length]
+    assert compressed.read(len(data) - 10, 100) == data[-10:]
+    assert compressed.read(len(data), 10) == b''
+
+
+def test_gzip_single_member(tmp_path):
+    data: bytes = _data(5 << 20)
+    path = tmp_path / "single.gz"
+    path.write_bytes(gzip.compress(data))
+
+    compressed: CompressedFile = CompressedFile(path)
+    assert compressed.compression == 'gzip'
+    assert len(compressed.units) == 1
+    _check_reads(compressed, data)
+    compressed.close()
+
+
+def test_gzip_multiple_members(tmp_path):
+    parts: list = [_data(1 << 20, seed) for seed in range(4)]
+    path = tmp_path / "members.gz"
+    path.write_bytes(b''.join(gzip.compress(part) for part in parts))
+
+    compressed: CompressedFile = CompressedFile(path)
+    assert len(compressed.units) == 4
+    assert [unit.uoff for unit in compressed.units] == [0, 1 << 20, 2 << 20, 3 << 20]
+    _check_reads(compressed, b''.join(parts))
+    # A match across two members
+    assert compressed.find(parts[1][-3:] + parts[2][:3]) == (2 << 20) - 3
+    compressed.close()
+
+
+def test_xz_multiple_streams(tmp_path):
+    parts: list = [_data(300_000, seed) for seed in range(3)]
+    path = tmp_path / "streams.xz"
+    # The second stream is followed by stream padding
+    path.write_bytes(lzma.compress(parts[0]) + lzma.compress(parts[1]) + bytes(8) + lzma.compress(parts[2]))
+
+    compressed: CompressedFile = CompressedFile(path)
+    assert len(compressed.units) == 3
+    _check_reads(compressed, b''.join(parts))
+    compressed.close()
+
+
+@pytest.mark.skipif(shutil.which("xz") is None, reason="The xz command is needed to write multiple blocks.")
+def test_xz_multiple_blocks(tmp_path):
+    data: bytes = _data(1 << 20)
+    path = tmp_path / "blocks.xz"
+    path.write_bytes(subprocess.run(["xz", "-c", "--block-size=65536"], input=data, stdout=subprocess.PIPE,
+                                    check=True).stdout)
+
+    compressed: CompressedFile = CompressedFile(path)
+    assert len(compressed.units) == 16
+    assert all(unit.ulen == 65536 for unit in compressed.units)
+    _check_reads(compressed, data)
+    compressed.close()
+
+
+def test_truncated_gzip(tmp_path):
+    data: bytes = _data(1 << 20)
+    path = tmp_path / "truncated.gz"
+    compressed_data: bytes = gzip.compress(data)
+    path.write_bytes(compressed_data[:len(compressed_data) // 2])
+
+    with pytest.raises(IOError):
+        CompressedFile(path)
+    assert not (tmp_path / "truncated.gz.phx").exists()
+
+    # A detected compression falls back to the raw file, an explicit one does not
+    handler: FileHandler = FileHandler(path)
+    handler.open()
+    assert handler.compressed is None
+    assert len(handler) == len(compressed_data) // 2
+    handler.close()
+    with pytest.raises(IOError):
+        FileHandler(path, compression="gzip")
+
+
+def test_truncated_xz(tmp_path):
+    path = tmp_path / "truncated.xz"
+    path.write_bytes(lzma.compress(_data(100_000))[:-20])
+
+    with pytest.raises(IOError):
+        CompressedFile(path)
+
+
+def test_truncated_zstd(tmp_path):
+    # A frame header (single segment, 1 byte content size) and a raw block, which is cut in its block header. The
+    # frame is rejected before it is decompressed, so zstandard is not needed.
+    frame: bytes = b'\x28\xb5\x2f\xfd\x20\x05' + ((5 << 3) | 1).to_bytes(3, 'little') + b'hello'
+    for cut in (5, 7, len(frame) - 2):
+        path = tmp_path / f"truncated_{cut}.zst"
+        path.write_bytes(frame[:cut])
+        with pytest.raises(IOError):
+            CompressedFile(path)
+
+
+def test_index_reuse(tmp_path, monkeypatch):
+    data: bytes = _data(1 << 20)
+    path = tmp_path / "reuse.gz"
+    path.write_bytes(gzip.compress(data[:500_000]) + gzip.compress(data[500_000:]))
+
+    CompressedFile(path).close()
+    index_file = tmp_path / "reuse.gz.phx"
+    assert index_file.exists()
+
+    def build(self):
+        raise AssertionError("The seek index was build again.")
+
+    monkeypatch.setattr(CompressedFile, "_CompressedFile__build_index", build)
+    compressed: CompressedFile = CompressedFile(path)
+    assert len(compressed.units) == 2
+    _check_reads(compressed, data)
+    compressed.close()
+
+
+def test_index_invalidation(tmp_path):
+    path = tmp_path / "changed.gz"
+    path.write_bytes(gzip.compress(_data(200_000, 1)) + gzip.compress(_data(200_000, 2)))
+    CompressedFile(path).close()
+    stat: os.stat_result = os.stat(path)
+
+    data: bytes = _data(300_000, 3)
+    path.write_bytes(gzip.compress(data))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    compressed: CompressedFile = CompressedFile(path)
+    assert len(compressed.units) == 1
+    _check_reads(compressed, data)
+    compressed.close()
+
+
+def test_zstd_frames(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    parts: list = [_data(400_000, seed) for seed in range(2)] + [_data(3 << 20, 2)]
+    skippable: bytes = b'\x50\x2a\x4d\x18' + (4).to_bytes(4, 'little') + b'skip'
+    # The last frame has many blocks, a checksum and no content size
+    streamed = zstandard.ZstdCompressor(write_checksum=True, write_content_size=False).compressobj()
+    path = tmp_path / "frames.zst"
+    path.write_bytes(zstandard.compress(parts[0]) + skippable + zstandard.compress(parts[1])
+                     + streamed.compress(parts[2]) + streamed.flush())
+
+    compressed: CompressedFile = CompressedFile(path)
+    assert compressed.compression == 'zstd'
+    assert len(compressed.units) == 3
+    _check_reads(compressed, b''.join(parts))
+    compressed.close()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# pyhexedit
+# Copyright (C) 2017  Michael Sasser <Michael@MichaelSasser.de>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+__author__ = "Michael Sasser"
+__email__ = "Michael@MichaelSasser.de"
+
+import os
+import random
+
+import pytest
+
+from pyhexedit.filehandler import FileHandler
+from pyhexedit.searchindex import SearchIndex
+
+BLOCK_SIZE: int = 4096
+
+
+@pytest.fixture
+def data() -> bytes:
+    # Few different bytes per block, so the index excludes most blocks
+    generator: random.Random = random.Random(0)
+    return bytes(b for block in range(64) for b in generator.choices(range(block * 4, block * 4 + 4), k=BLOCK_SIZE))
+
+
+def _handler(path) -> FileHandler:
+    handler: FileHandler = FileHandler(path, auto_inram_mode=False)
+    handler.open()
+    return handler
+
+
+def _find_all(handler: FileHandler, value: bytes) -> list:
+    found: list = []
+    address = handler.find(value)
+    while address is not None:
+        found.append(address)
+        address = handler.find(value, address + 1)
+    return found
+
+
+def _expected(data: bytes, value: bytes) -> list:
+    found: list = []
+    address: int = data.find(value)
+    while address != -1:
+        found.append(address)
+        address = data.find(value, address + 1)
+    return found
+
+
+def test_build_and_search(tmp_path, data):
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    handler: FileHandler = _handler(path)
+    handler.build_search_index(BLOCK_SIZE)
+    assert (tmp_path / "data.bin.phi").exists()
+
+    index: SearchIndex = handler.search_index
+    assert index.valid and index.length == len(data)
+    value: bytes = data[10 * BLOCK_SIZE + 100:10 * BLOCK_SIZE + 103]
+    # A match starting at the end of block 9 would have its bigrams in block 10, so block 9 is scanned too
+    assert index.candidates(value) == [(9 * BLOCK_SIZE, 11 * BLOCK_SIZE + 2)]
+    assert _find_all(handler, value) == _expected(data, value)
+    assert handler.find(b'\x00\xff') is None  # The bytes are in the first and the last block
+    handler.close()
+
+
+def test_match_across_blocks(tmp_path, data):
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    handler: FileHandler = _handler(path)
+    handler.build_search_index(BLOCK_SIZE)
+
+    for start in range(5 * BLOCK_SIZE - 6, 5 * BLOCK_SIZE + 1):  # Across the boundary of the blocks 4 and 5
+        value: bytes = data[start:start + 6]
+        ranges: list = handler.search_index.candidates(value)
+        assert any(range_start <= start and start + len(value) <= range_stop for range_start, range_stop in ranges)
+        assert _find_all(handler, value) == _expected(data, value)
+    handler.close()
+
+
+def test_fixed_byteorder(tmp_path):
+    # The bigram 0x01 0x02 is the bit 0x0102 of the bitmap on every machine
+    path = tmp_path / "bigram.bin"
+    path.write_bytes(b'\x01\x02')
+    index: SearchIndex = SearchIndex(path)
+    handler: FileHandler = _handler(path)
+    index.build(handler)
+    handler.close()
+    index.close()
+
+    bitmap: bytes = path.with_name("bigram.bin.phi").read_bytes().split(b'\n', 1)[1]
+    assert len(bitmap) == (1 << 16) // 8
+    assert [position for position, byte in enumerate(bitmap) if byte] == [0x0102 >> 3]
+    assert bitmap[0x0102 >> 3] == 0x80 >> (0x0102 & 0x07)
+
+
+def test_reuse(tmp_path, data):
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    handler: FileHandler = _handler(path)
+    handler.build_search_index(BLOCK_SIZE)
+    handler.close()
+
+    index: SearchIndex = SearchIndex(path)
+    assert index.valid
+    assert index.block_size == BLOCK_SIZE and index.length == len(data)
+    value: bytes = data[20 * BLOCK_SIZE:20 * BLOCK_SIZE + 4]
+    assert index.candidates(value) == [(19 * BLOCK_SIZE, 21 * BLOCK_SIZE + 3)]
+    index.close()
+
+    # find() of a new handler loads the saved index
+    handler = _handler(path)
+    assert _find_all(handler, value) == _expected(data, value)
+    assert handler.search_index is not None and handler.search_index.valid
+    handler.close()
+
+
+def test_invalidation(tmp_path, data):
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    handler: FileHandler = _handler(path)
+    handler.build_search_index(BLOCK_SIZE)
+    handler.close()
+    stat: os.stat_result = os.stat(path)
+
+    # The same size, a new modification time and a value, which is not in the old index
+    changed: bytearray = bytearray(data)
+    changed[3 * BLOCK_SIZE:3 * BLOCK_SIZE + 4] = b'\xf0\xf1\xf2\xf3'
+    path.write_bytes(changed)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    index: SearchIndex = SearchIndex(path)
+    assert not index.valid
+    assert index.length == 0
+    assert index.candidates(b'\xf0\xf1') is None
+    index.close()
+
+    handler = _handler(path)
+    assert handler.find(b'\xf0\xf1\xf2\xf3') == 3 * BLOCK_SIZE
+    handler.close()
+
+
+def test_damaged(tmp_path, data):
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    handler: FileHandler = _handler(path)
+    handler.build_search_index(BLOCK_SIZE)
+    handler.close()
+
+    index_file = tmp_path / "data.bin.phi"
+    index_file.write_bytes(index_file.read_bytes()[:-1])
+    index: SearchIndex = SearchIndex(path)
+    assert not index.valid
+    index.close()